@@ -0,0 +1,249 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Configuration, Items, Media
+from config.config import new_id
+from config.storage import write_json
+from cli.listing import Listing, rows
+
+# Operations that only touch this many entries per call, whatever the size
+# of the document (e.g. bulk-remove removes BATCH items from N).
+BATCH = 100
+
+def items_document(size: int) -> dict:
+    __ids = [new_id() for _ in range(size)]
+    return {lang: [{"id": __ids[i], "title": f"Tile {i}", "link": f"https://example.com/{lang}/{i}", "type": ["website", "external", "pdf"][i % 3]} for i in range(size)] for lang in ["de", "en"]}
+
+def media_document(size: int) -> dict:
+    return {"media": [{"id": new_id(), "title": f"Media {i}", "link": f"/images/{i}.jpg" if i % 4 else f"/videos/{i}.mp4", "type": "image" if i % 4 else "video", "description": ""} for i in range(size)]}
+
+def fixture(directory: str, size: int) -> dict:
+    paths = {
+        "config": os.path.join(directory, "shifiq.conf"),
+        "items": os.path.join(directory, "items.json"),
+        "media": os.path.join(directory, "media.json"),
+        "media_directory": os.path.join(directory, "media")
+    }
+    os.makedirs(paths["media_directory"], exist_ok=True)
+    write_json(paths["items"], items_document(size))
+    write_json(paths["media"], media_document(size))
+    # Pristine copies; every timed run starts from them again.
+    for name in ["items", "media"]:
+        shutil.copyfile(paths[name], f"{paths[name]}.orig")
+    with open(paths["config"], "w") as file:
+        file.write(f"[kiosk]\nitems_config_file = {paths['items']}\nmedia_config_file = {paths['media']}\nmedia_directory = {paths['media_directory']}\nthumbnail_sizes = 320,640\n")
+    return paths
+
+def restore(paths: dict) -> None:
+    for name in ["items", "media"]:
+        shutil.copyfile(f"{paths[name]}.orig", paths[name])
+
+def measure(function, repeat: int, calls: int = 1, setup=None) -> dict:
+    timings = []
+    counts = []
+    for _ in range(repeat):
+        # Operations that change the documents would otherwise run on a
+        # catalog that shrinks or grows with every repeat.
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        __done = function()
+        timings.append(time.perf_counter() - start)
+        # Operations that can run out of entries return how many they did.
+        counts.append(__done if isinstance(__done, int) else calls)
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "max": max(timings),
+        "per_call": statistics.median(seconds / max(1, count) for seconds, count in zip(timings, counts)),
+        "calls": statistics.median(counts)
+    }
+
+def listing(entries: list) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        __listing = Listing("json", [("ID", "id", None)])
+        __listing.write(None, rows(entries))
+        __listing.close()
+
+def operations(paths: dict) -> dict:
+    config = Configuration(paths["config"])
+
+    def items_add() -> None:
+        with Items(paths["items"]) as items:
+            __id = new_id()
+            for lang in ["de", "en"]:
+                items.add(lang, "Bench", "https://example.com/bench", "website", 1, __id)
+            items.flush()
+
+    def items_edit() -> None:
+        with Items(paths["items"]) as items:
+            __ref = items.get("de")[len(items.get("de")) // 2]["id"]
+            items.edit(items.resolve("de", __ref), "de", title="Edited", output=False)
+            items.flush()
+
+    def items_remove() -> int:
+        with Items(paths["items"]) as items:
+            items.remove("de", items.resolve("de", items.get("de")[-1]["id"]))
+            items.flush()
+        return 1
+
+    def items_bulk_remove() -> int:
+        with Items(paths["items"]) as items:
+            __ids = [item["id"] for item in items.get("en")[:BATCH]]
+            for position in sorted([items.resolve("en", id) for id in __ids], reverse=True):
+                items.remove("en", position)
+            items.flush()
+        return len(__ids)
+
+    def items_resolve() -> int:
+        items = Items(paths["items"])
+        __items = items.get("de")[:BATCH]
+        for item in __items:
+            items.resolve("de", item["id"], output=False)
+        return len(__items)
+
+    def media_add() -> None:
+        with Media(paths["media"], paths["media_directory"]) as media:
+            media.add("Bench", "bench.jpg", "image", id=new_id())
+            media.flush()
+
+    def media_edit() -> None:
+        with Media(paths["media"], paths["media_directory"]) as media:
+            __ref = media.get()[media.len // 2]["id"]
+            media.edit(media.resolve(__ref), title="Edited", output=False)
+            media.flush()
+
+    def media_remove() -> None:
+        with Media(paths["media"], paths["media_directory"]) as media:
+            media.remove(media.resolve(media.get()[-1]["id"]))
+            media.flush()
+
+    def config_get() -> None:
+        for _ in range(BATCH):
+            config.get("kiosk", "items_config_file")
+            config.get_list("kiosk", "thumbnail_sizes")
+
+    return {
+        "config.get": (config_get, BATCH * 2),
+        "items.load": (lambda: Items(paths["items"]).items, 1),
+        "items.add": (items_add, 1),
+        "items.edit": (items_edit, 1),
+        "items.remove": (items_remove, 1),
+        "items.bulk_remove": (items_bulk_remove, BATCH),
+        "items.resolve": (items_resolve, BATCH),
+        "items.list": (lambda: listing(Items(paths["items"]).get("de")), 1),
+        "media.load": (lambda: Media(paths["media"], paths["media_directory"]).media, 1),
+        "media.add": (media_add, 1),
+        "media.edit": (media_edit, 1),
+        "media.remove": (media_remove, 1),
+        "media.list": (lambda: listing(Media(paths["media"], paths["media_directory"]).get()), 1)
+    }
+
+def videos(directory: str, count: int, seconds: int = 2) -> bool:
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        return False
+    os.makedirs(directory, exist_ok=True)
+    __gradient = np.tile(np.linspace(0, 255, 320, dtype=np.uint8), (240, 1))
+    for index in range(count):
+        writer = cv2.VideoWriter(os.path.join(directory, f"video-{index}.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), 25, (320, 240))
+        for frame in range(25 * seconds):
+            # A moving gradient, so frames differ and the scorer has work to do.
+            __channel = np.roll(__gradient, frame * 4 + index, axis=1)
+            writer.write(cv2.merge([__channel, __channel[::-1], np.full_like(__channel, index * 16 % 256)]))
+        writer.release()
+    return True
+
+def thumbnails(directory: str, count: int, workers: int, repeat: int) -> dict:
+    __source = os.path.join(directory, "videos")
+    if not videos(__source, count):
+        return {}
+    from tools.thumbnail import Thumbnail
+    __target = os.path.join(directory, "thumbnails")
+
+    def generate(force: bool):
+        with contextlib.redirect_stdout(io.StringIO()):
+            Thumbnail(__source, __target, sizes=[320, 640]).generate(workers, force)
+
+    return {
+        "thumbnail.cold": measure(lambda: generate(True), repeat, count),
+        # Unchanged videos are skipped through the manifest.
+        "thumbnail.warm": measure(lambda: generate(False), repeat, count)
+    }
+
+def run(sizes: list, repeat: int, video_count: int, workers: int) -> dict:
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix="shifiq-bench-") as directory:
+            paths = fixture(directory, size)
+            results[str(size)] = {name: measure(function, repeat, calls, lambda: restore(paths)) for name, (function, calls) in operations(paths).items()}
+    if video_count > 0:
+        with tempfile.TemporaryDirectory(prefix="shifiq-bench-") as directory:
+            __thumbnails = thumbnails(directory, video_count, workers, repeat)
+            if len(__thumbnails) > 0:
+                results["videos"] = __thumbnails
+    return results
+
+def regressions(results: dict, baseline: dict, tolerance: float, floor: float) -> list:
+    found = []
+    for group, operations in results.items():
+        for name, result in operations.items():
+            __before = baseline.get(group, {}).get(name)
+            # Operations faster than the floor are dominated by timer noise.
+            if __before is None or __before["median"] < floor:
+                continue
+            if result["median"] > __before["median"] * (1 + tolerance):
+                found.append({"group": group, "operation": name, "baseline": __before["median"], "median": result["median"]})
+    return found
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time config, item, media and thumbnail operations on synthetic data.")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=[10, 1000, 10000, 100000], help="comma separated entry counts per document")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs per operation")
+    parser.add_argument("--videos", type=int, default=4, help="number of synthetic videos for the thumbnail benchmark (0 to skip, needs cv2)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of thumbnail workers")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("--floor", type=float, default=0.001, help="ignore operations whose baseline median is below this many seconds")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.videos, args.workers)
+    report = {
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "results": results
+    }
+    if args.baseline is not None:
+        with open(args.baseline, "r") as file:
+            report["regressions"] = regressions(results, json.load(file)["results"], args.tolerance, args.floor)
+    if args.output is not None:
+        write_json(args.output, report)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for group, operations in results.items():
+            print(f"{group}:")
+            for name, result in operations.items():
+                print(f"  {name:<20} median {result['median'] * 1000:9.2f} ms   per call {result['per_call'] * 1000:9.3f} ms")
+        for regression in report.get("regressions", []):
+            print(f"regression: {regression['group']} {regression['operation']} {regression['baseline'] * 1000:.2f} ms -> {regression['median'] * 1000:.2f} ms")
+    if len(report.get("regressions", [])) > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only specific commands need; none of them may be loaded by
+# importing the entry point or parsing arguments.
+LAZY_MODULES = ["rich.table", "rich.tree", "rich.prompt", "cv2", "numpy"]
+
+def cold_start(runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "shifiq.py", "--quiet", "--help"], cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def eager_modules() -> list:
+    __code = (
+        "import sys, json, shifiq, cli; "
+        "shifiq.Arguments(); "
+        f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    )
+    __output = subprocess.run([sys.executable, "-c", __code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(__output.stdout)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Guard the cold-start time of the shifiq entry point.")
+    parser.add_argument("--runs", type=int, default=10, help="number of cold starts to time")
+    parser.add_argument("--budget", type=float, default=0.25, help="maximum median cold-start time in seconds")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    timings = cold_start(args.runs)
+    eager = eager_modules()
+    result = {
+        "runs": args.runs,
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "max": max(timings),
+        "budget": args.budget,
+        "eager_modules": eager
+    }
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"cold start: median {result['median'] * 1000:.1f} ms, min {result['min'] * 1000:.1f} ms, max {result['max'] * 1000:.1f} ms (budget {args.budget * 1000:.0f} ms)")
+        if len(eager) > 0:
+            print(f"eagerly imported: {', '.join(eager)}")
+    if result["median"] > args.budget or len(eager) > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
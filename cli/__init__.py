@@ -1,2 +1,9 @@
 from .args import Arguments
-from .cli import CLI
\ No newline at end of file
+
+# CLI pulls in rich and the config package; it is only imported once a
+# command actually runs, so argument parsing stays cheap.
+def __getattr__(name: str):
+    if name == "CLI":
+        from .cli import CLI
+        return CLI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
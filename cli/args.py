@@ -1,11 +1,30 @@
 import argparse
-from config import Configuration
-from .cli import CLI
+import os
+
+def key_value(value: str) -> tuple:
+    if "=" not in value:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {value!r}")
+    key, value = value.split("=", 1)
+    return key.strip(), value.strip()
+
+def listing(parser: argparse.ArgumentParser, prefix: str) -> None:
+    parser.add_argument("--limit", help="specify the maximum number of entries to show", metavar="N", dest=f"{prefix}_limit", type=int, default=None)
+    parser.add_argument("--offset", help="specify the number of matching entries to skip", metavar="N", dest=f"{prefix}_offset", type=int, default=0)
+    parser.add_argument("--filter", help="specify a KEY=VALUE the entries must match, e.g. type=video (repeatable)", metavar="KEY=VALUE", dest=f"{prefix}_filters", type=key_value, action="append", default=None)
+    parser.add_argument("--search", help="specify a text to search for in the id, title, link and description", metavar="TEXT", dest=f"{prefix}_search", type=str, default=None)
+    parser.add_argument("--format", help="specify the output format", metavar="FORMAT", dest=f"{prefix}_format", type=str, choices=["table", "json", "csv"], default="table")
 
 class Arguments:
-    def __init__(self, cli: CLI) -> None:
-        self.__cli = cli
+    def __init__(self) -> None:
+        self.__cli = None
         self.__parser = argparse.ArgumentParser(prog="shifiq", description="ShiftIQ CLI")
+        self.__parser.add_argument("-q", "--quiet", "--no-banner", action="store_true", help="skip the banner and informational output (machine mode)", dest="quiet")
+        self.__parser.add_argument("--timings", action="store_const", const="text", help="report the time per phase and the file I/O on stderr", dest="timings", default=None)
+        self.__parser.add_argument("--timings-json", action="store_const", const="json", help="report the timings as one JSON line on stderr", dest="timings")
+        self.__parser.add_argument("--profile", help="write a cProfile profile of the command to FILE (main process only)", metavar="FILE", dest="profile", type=str, default=None)
+        self.__targets = self.__parser.add_mutually_exclusive_group()
+        self.__targets.add_argument("--kiosk", help="specify the kiosk to manage (repeatable)", metavar="NAME", dest="kiosks", action="append", default=None)
+        self.__targets.add_argument("--all-kiosks", action="store_true", help="manage every kiosk in the configuration file", dest="all_kiosks")
         self.__subparsers = self.__parser.add_subparsers(dest="command", title="commands", description="valid commands", help="additional help")
         self.__config = self.__subparsers.add_parser("config", help="manage the configuration file")
         self.__config.add_argument("-f", "--file", help="specify the configuration file", metavar="FILE", default="shifiq.conf", dest="config_file")
@@ -20,38 +39,152 @@ class Arguments:
         self.__kiosk_add.add_argument("--link", help="specify the link of the item", metavar="LINK", required=True, dest="kiosk_add_link", type=str)
         self.__kiosk_add.add_argument("--type", help="specify the type of the item", metavar="TYPE", required=True, dest="kiosk_add_type", type=str, choices=["website", "external", "pdf"])
         self.__kiosk_add.add_argument("--language", help="specify the language of the item", metavar="LANGUAGE", required=True, dest="kiosk_add_language", type=str, choices=["de", "en", "all"], default="all")
-        self.__kiosk_add.add_argument("--position", help="specify the position of the item", metavar="POSITION", dest="kiosk_add_position", type=int, default=None)
+        self.__kiosk_add.add_argument("--position", help="specify the position of the item", metavar="POSITION", dest="kiosk_add_position", type=int, default=0)
 
         self.__kiosk_remove = self.__kiosk_sub.add_parser("remove", help="remove a kiosk item")
-        self.__kiosk_remove.add_argument("--id", help="specify the id of the item", metavar="ID", required=True, dest="kiosk_rm_id", type=int)
+        self.__kiosk_remove.add_argument("--id", help="specify the id or position of the item", metavar="ID", required=True, dest="kiosk_rm_id", type=str)
         self.__kiosk_remove.add_argument("--language", help="specify the language of the item", metavar="LANGUAGE", required=True, dest="kiosk_rm_language", type=str, choices=["de", "en", "all"], default="all")
 
         self.__kiosk_list = self.__kiosk_sub.add_parser("list", help="list all kiosk items")
+        self.__kiosk_list.add_argument("--language", help="specify the language of the items", metavar="LANGUAGE", dest="kiosk_list_language", type=str, choices=["de", "en", "all"], default="all")
+        listing(self.__kiosk_list, "kiosk_list")
 
         self.__kiosk_edit = self.__kiosk_sub.add_parser("edit", help="edit a kiosk item")
-        self.__kiosk_edit.add_argument("--id", help="specify the id of the item", metavar="ID", required=True, dest="kiosk_edit_id", type=int)
+        self.__kiosk_edit.add_argument("--id", help="specify the id or position of the item", metavar="ID", required=True, dest="kiosk_edit_id", type=str)
         self.__kiosk_edit.add_argument("--language", help="specify the language of the item", metavar="LANGUAGE", required=True, dest="kiosk_edit_language", type=str, choices=["de", "en", "all"])
         self.__kiosk_edit.add_argument("--title", help="specify the title of the item", metavar="TITLE", dest="kiosk_edit_title", type=str, default=None)
         self.__kiosk_edit.add_argument("--link", help="specify the link of the item", metavar="LINK", dest="kiosk_edit_link", type=str, default=None)
         self.__kiosk_edit.add_argument("--type", help="specify the type of the item", metavar="TYPE", dest="kiosk_edit_type", type=str, choices=["website", "external", "pdf"], default=None)
 
+        self.__kiosk_move = self.__kiosk_sub.add_parser("move", help="move a kiosk item to another position")
+        self.__kiosk_move.add_argument("--id", help="specify the id or position of the item", metavar="ID", required=True, dest="kiosk_move_id", type=str)
+        self.__kiosk_move.add_argument("--to", help="specify the new position of the item", metavar="POSITION", required=True, dest="kiosk_move_to", type=int)
+        self.__kiosk_move.add_argument("--language", help="specify the language of the item", metavar="LANGUAGE", dest="kiosk_move_language", type=str, choices=["de", "en", "all"], default="all")
+
+        self.__kiosk_reorder = self.__kiosk_sub.add_parser("reorder", help="reorder the kiosk items")
+        self.__kiosk_reorder.add_argument("--order", help="specify the new order as ids, e.g. 3,1,2 (unlisted items follow)", metavar="IDS", required=True, dest="kiosk_reorder_order", type=lambda value: [id.strip() for id in value.split(",") if id.strip() != ""])
+        self.__kiosk_reorder.add_argument("--language", help="specify the language of the items", metavar="LANGUAGE", dest="kiosk_reorder_language", type=str, choices=["de", "en", "all"], default="all")
+
         self.__kiosk_bulk_remove = self.__kiosk_sub.add_parser("bulk-remove", help="remove all kiosk items")
-        self.__kiosk_bulk_remove.add_argument("--ids", help="specify the ids of the items to remove", metavar="IDS", required=True, dest="kiosk_bulk_rm_ids", type=int, nargs="+")
+        self.__kiosk_bulk_remove.add_argument("--ids", help="specify the ids or positions of the items to remove", metavar="IDS", required=True, dest="kiosk_bulk_rm_ids", type=str, nargs="+")
+
+        self.__kiosk_apply = self.__kiosk_sub.add_parser("apply", help="apply a batch of kiosk operations")
+        self.__kiosk_apply.add_argument("file", help="specify the JSON Lines or YAML file with the operations (- for stdin)", metavar="FILE", nargs="?", default="-")
+        self.__kiosk_apply.add_argument("--format", help="specify the format of the operations", metavar="FORMAT", dest="kiosk_apply_format", type=str, choices=["auto", "jsonl", "yaml"], default="auto")
+        self.__kiosk_apply.add_argument("--dry-run", action="store_true", help="show the resulting changes without writing them", dest="kiosk_apply_dry_run")
+
+        self.__kiosk_check = self.__kiosk_sub.add_parser("check", help="check that every tile link is reachable")
+        self.__kiosk_check.add_argument("--concurrency", help="specify the number of links checked at once", metavar="N", dest="kiosk_check_concurrency", type=int, default=None)
+        self.__kiosk_check.add_argument("--timeout", help="specify the timeout per request in seconds", metavar="SECONDS", dest="kiosk_check_timeout", type=float, default=None)
+        self.__kiosk_check.add_argument("--refresh", action="store_true", help="ignore cached results", dest="kiosk_check_refresh")
+        self.__kiosk_check.add_argument("--all", action="store_true", help="show every tile, not only the broken ones", dest="kiosk_check_all")
+
+        self.__kiosk_history = self.__kiosk_sub.add_parser("history", help="list the recorded changes")
+        self.__kiosk_history.add_argument("--limit", help="specify the number of recent changes to show", metavar="N", dest="kiosk_history_limit", type=int, default=20)
+
+        self.__kiosk_undo = self.__kiosk_sub.add_parser("undo", help="revert the most recent changes")
+        self.__kiosk_undo.add_argument("--steps", help="specify the number of commands to revert", metavar="N", dest="kiosk_undo_steps", type=int, default=1)
+        self.__kiosk_undo.add_argument("--force", action="store_true", help="revert even if the files were changed outside of shifiq", dest="kiosk_undo_force")
+
+        self.__kiosk_restore = self.__kiosk_sub.add_parser("restore", help="revert every change recorded after a history entry")
+        self.__kiosk_restore.add_argument("--at", help="specify the history entry to go back to (0 for the oldest state kept)", metavar="SEQ", required=True, dest="kiosk_restore_at", type=int)
+        self.__kiosk_restore.add_argument("--force", action="store_true", help="revert even if the files were changed outside of shifiq", dest="kiosk_restore_force")
+
+        self.__kiosk_publish = self.__kiosk_sub.add_parser("publish", help="write a versioned, precompressed bundle for the kiosk front end")
+        self.__kiosk_publish.add_argument("--target", help="specify the bundle directory", metavar="DIRECTORY", dest="kiosk_publish_target", type=str, default=None)
+        self.__kiosk_publish.add_argument("--base-url", help="specify the URL the bundle is served from", metavar="URL", dest="kiosk_publish_base_url", type=str, default=None)
+
+        self.__kiosk_export = self.__kiosk_sub.add_parser("export", help="write items.json and media.json from the configured storage")
 
         self.__kiosk_wizard = self.__kiosk_sub.add_parser("wizard", help="run the kiosk wizard")
         self.__kiosk_clear = self.__kiosk_sub.add_parser("clear", help="clear all kiosk items")
 
+        self.__media = self.__subparsers.add_parser("media", help="manage the kiosk media")
+        self.__media_sub = self.__media.add_subparsers(dest="media_command", title="media commands", description="valid media commands", help="additional help")
+        self.__media_list = self.__media_sub.add_parser("list", help="list all media entries")
+        listing(self.__media_list, "media_list")
+
+        self.__media_sync = self.__media_sub.add_parser("sync", help="synchronize the media file with the media directory")
+        self.__media_sync.add_argument("--prune", action="store_true", help="remove media entries whose file is missing", dest="media_sync_prune")
+        self.__media_sync.add_argument("--dry-run", action="store_true", help="show the changes without writing them", dest="media_sync_dry_run")
+        self.__media_sync.add_argument("--rescan", action="store_true", help="ignore the directory index and scan everything", dest="media_sync_rescan")
+
+        self.__media_dedup = self.__media_sub.add_parser("dedup", help="find duplicate media files and point the media file at one copy")
+        self.__media_dedup_group = self.__media_dedup.add_mutually_exclusive_group()
+        self.__media_dedup_group.add_argument("--link", action="store_const", const="link", help="replace duplicate copies with hard links", dest="media_dedup_mode")
+        self.__media_dedup_group.add_argument("--delete", action="store_const", const="delete", help="delete duplicate copies", dest="media_dedup_mode")
+        self.__media_dedup.add_argument("--dry-run", action="store_true", help="show the duplicates without changing anything", dest="media_dedup_dry_run")
+        self.__media_dedup.add_argument("--workers", help="specify the number of hashing threads", metavar="N", dest="media_dedup_workers", type=int, default=None)
+
         self.__tools = self.__subparsers.add_parser("tools", help="manage the tools")
         self.__tools_sub = self.__tools.add_subparsers(dest="tools_command", title="tools commands", description="valid tools commands", help="additional help")
         self.__tools_thumbnail = self.__tools_sub.add_parser("thumbnail", help="generate thumbnails for videos")
         self.__tools_thumbnail.add_argument("--source", help="specify the path to the videos", metavar="VIDEO_PATH", dest="tools_thumbnail_video_path", type=str, default=None)
         self.__tools_thumbnail.add_argument("--target", help="specify the path to the media", metavar="MEDIA_PATH", dest="tools_thumbnail_media_path", type=str, default=None)
+        self.__tools_thumbnail.add_argument("--workers", help="specify the number of worker processes", metavar="N", dest="tools_thumbnail_workers", type=int, default=os.cpu_count() or 1)
+        self.__tools_thumbnail.add_argument("--force", action="store_true", help="regenerate thumbnails even for unchanged videos", dest="tools_thumbnail_force")
+        self.__tools_thumbnail.add_argument("--hash", action="store_true", help="compare video contents by hash when only the modification time changed", dest="tools_thumbnail_hash")
+        self.__tools_thumbnail.add_argument("--mode", help="seek to the nearest keyframe (fast) or to the exact frame (accurate)", metavar="MODE", dest="tools_thumbnail_mode", type=str, choices=["fast", "accurate"], default="fast")
+        self.__tools_thumbnail.add_argument("--candidates", help="specify how many frames to compare when picking the thumbnail", metavar="N", dest="tools_thumbnail_candidates", type=int, default=3)
+        self.__tools_thumbnail.add_argument("--sizes", help="specify the widths of the thumbnail variants, e.g. 320,1280 (default: thumbnail_sizes)", metavar="WIDTHS", dest="tools_thumbnail_sizes", type=lambda value: [int(size) for size in value.split(",") if size.strip() != ""], default=None)
+        self.__tools_thumbnail.add_argument("--quality", help="specify the JPEG/WebP quality from 0 to 100 (default: thumbnail_quality or 85)", metavar="QUALITY", dest="tools_thumbnail_quality", type=int, default=None)
+        self.__tools_thumbnail.add_argument("--timeout", help="specify the seconds a single video may take before it is given up (default: thumbnail_timeout or 120, 0 for none)", metavar="SECONDS", dest="tools_thumbnail_timeout", type=float, default=None)
+        self.__tools_thumbnail.add_argument("--format", help="specify the format of the thumbnail variants (default: thumbnail_format or jpg)", metavar="FORMAT", dest="tools_thumbnail_format", type=str, choices=["jpg", "webp"], default=None)
+
+        self.__tools_transcode = self.__tools_sub.add_parser("transcode", help="re-encode videos for the kiosk players (size, bitrate, faststart)")
+        self.__tools_transcode.add_argument("--workers", help="specify the number of worker processes", metavar="N", dest="tools_transcode_workers", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+        self.__tools_transcode.add_argument("--force", action="store_true", help="check videos again even if they were handled before", dest="tools_transcode_force")
+        self.__tools_transcode.add_argument("--dry-run", action="store_true", help="list the videos that would be checked without changing them", dest="tools_transcode_dry_run")
+        self.__tools_transcode.add_argument("--max-width", help="specify the maximum width in pixels", metavar="PIXELS", dest="tools_transcode_max_width", type=int, default=None)
+        self.__tools_transcode.add_argument("--max-height", help="specify the maximum height in pixels", metavar="PIXELS", dest="tools_transcode_max_height", type=int, default=None)
+        self.__tools_transcode.add_argument("--bitrate", help="specify the video bitrate in kbit/s", metavar="KBPS", dest="tools_transcode_bitrate", type=int, default=None)
+        self.__tools_transcode.add_argument("--max-fps", help="specify the maximum frame rate", metavar="FPS", dest="tools_transcode_max_fps", type=int, default=None)
+        self.__tools_transcode.add_argument("--encoder", help="specify the encoder", metavar="ENCODER", dest="tools_transcode_encoder", type=str, choices=["auto", "ffmpeg", "opencv"], default=None)
+        self.__tools_transcode.add_argument("--no-originals", action="store_false", help="do not keep the original files in media_directory/originals", dest="tools_transcode_keep_originals")
+
+        self.__tools_optimize = self.__tools_sub.add_parser("optimize-images", help="downscale, strip and re-encode the images for the kiosk display")
+        self.__tools_optimize.add_argument("--workers", help="specify the number of worker processes", metavar="N", dest="tools_optimize_workers", type=int, default=os.cpu_count() or 1)
+        self.__tools_optimize.add_argument("--force", action="store_true", help="optimize all images, even unchanged ones", dest="tools_optimize_force")
+        self.__tools_optimize.add_argument("--dry-run", action="store_true", help="list the images that would be optimized without changing them", dest="tools_optimize_dry_run")
+        self.__tools_optimize.add_argument("--max-width", help="specify the maximum width in pixels", metavar="PIXELS", dest="tools_optimize_max_width", type=int, default=None)
+        self.__tools_optimize.add_argument("--max-height", help="specify the maximum height in pixels", metavar="PIXELS", dest="tools_optimize_max_height", type=int, default=None)
+        self.__tools_optimize.add_argument("--quality", help="specify the JPEG/WebP quality (1-100)", metavar="QUALITY", dest="tools_optimize_quality", type=int, default=None)
+        self.__tools_optimize.add_argument("--baseline", action="store_const", const=False, help="write baseline instead of progressive JPEGs", dest="tools_optimize_progressive", default=None)
+        self.__tools_optimize.add_argument("--no-originals", action="store_false", help="do not keep the original files in media_directory/originals", dest="tools_optimize_keep_originals")
+
+        self.__tools_watch = self.__tools_sub.add_parser("watch", help="watch the media directory and update thumbnails and the media file as files arrive")
+        self.__tools_watch.add_argument("--workers", help="specify the number of thumbnail processes", metavar="N", dest="tools_watch_workers", type=int, default=os.cpu_count() or 1)
+        self.__tools_watch.add_argument("--settle", help="specify how many seconds a file must stay unchanged before it is used", metavar="SECONDS", dest="tools_watch_settle", type=float, default=2.0)
+        self.__tools_watch.add_argument("--interval", help="specify the polling interval in seconds when inotify is not available", metavar="SECONDS", dest="tools_watch_interval", type=float, default=1.0)
+        self.__tools_watch.add_argument("--poll", action="store_true", help="poll the directories instead of using inotify", dest="tools_watch_poll")
+        self.__tools_watch.add_argument("--prune", action="store_true", help="remove media entries whose file was deleted", dest="tools_watch_prune")
+
+        self.__tools_preview = self.__tools_sub.add_parser("preview", help="generate contact sheets and looping previews for videos")
+        self.__tools_preview.add_argument("--frames", help="specify the number of frames to sample per video", metavar="N", dest="tools_preview_frames", type=int, default=12)
+        self.__tools_preview.add_argument("--columns", help="specify the number of columns of the contact sheet", metavar="N", dest="tools_preview_columns", type=int, default=4)
+        self.__tools_preview.add_argument("--width", help="specify the width of a single frame", metavar="PIXELS", dest="tools_preview_width", type=int, default=320)
+        self.__tools_preview.add_argument("--no-sheet", action="store_false", help="do not write a contact sheet", dest="tools_preview_sheet")
+        self.__tools_preview.add_argument("--loop", action="store_true", help="also write a short looping preview video", dest="tools_preview_loop")
+        self.__tools_preview.add_argument("--workers", help="specify the number of worker processes", metavar="N", dest="tools_preview_workers", type=int, default=os.cpu_count() or 1)
+        self.__tools_preview.add_argument("--force", action="store_true", help="regenerate previews even for unchanged videos", dest="tools_preview_force")
 
-    def __parse(self) -> argparse.Namespace:
+    def parse(self) -> argparse.Namespace:
         return self.__parser.parse_args()
 
-    def run(self) -> None:
-        args = self.__parse()
+    def run(self, cli, args: argparse.Namespace) -> None:
+        self.__cli = cli
+        if args.profile is None:
+            self.__dispatch(args)
+            return
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(self.__dispatch, args)
+        finally:
+            # Also written when the command exits early or fails.
+            profiler.dump_stats(args.profile)
+
+    def __dispatch(self, args: argparse.Namespace) -> None:
         if args.command == "config":
             if args.config_all:
                 self.__cli.list_section()
@@ -71,14 +204,43 @@ class Arguments:
                 self.__cli.remove_item(args.kiosk_rm_language, args.kiosk_rm_id)
                 return
             if args.kiosk_command == "list":
-                self.__cli.list_items()
+                self.__cli.list_items(args.kiosk_list_language, args.kiosk_list_filters, args.kiosk_list_search, args.kiosk_list_offset, args.kiosk_list_limit, args.kiosk_list_format)
                 return
             if args.kiosk_command == "edit":
                 self.__cli.edit_item(args.kiosk_edit_id, args.kiosk_edit_language, args.kiosk_edit_title, args.kiosk_edit_link, args.kiosk_edit_type)
                 return
+            if args.kiosk_command == "move":
+                self.__cli.move_item(args.kiosk_move_language, args.kiosk_move_id, args.kiosk_move_to)
+                return
+            if args.kiosk_command == "reorder":
+                self.__cli.reorder_items(args.kiosk_reorder_language, args.kiosk_reorder_order)
+                return
             if args.kiosk_command == "bulk-remove":
                 self.__cli.bulk_remove(args.kiosk_bulk_rm_ids)
                 return
+            if args.kiosk_command == "apply":
+                self.__cli.apply(args.file, args.kiosk_apply_format, args.kiosk_apply_dry_run)
+                return
+            if args.kiosk_command == "check":
+                if not self.__cli.check_links(args.kiosk_check_concurrency, args.kiosk_check_timeout, args.kiosk_check_refresh, args.kiosk_check_all):
+                    exit(1)
+                return
+            if args.kiosk_command == "history":
+                self.__cli.history(args.kiosk_history_limit)
+                return
+            if args.kiosk_command == "undo":
+                self.__cli.undo(args.kiosk_undo_steps, args.kiosk_undo_force)
+                return
+            if args.kiosk_command == "restore":
+                self.__cli.restore(args.kiosk_restore_at, args.kiosk_restore_force)
+                return
+            if args.kiosk_command == "publish":
+                if not self.__cli.publish(args.kiosk_publish_target, args.kiosk_publish_base_url):
+                    exit(1)
+                return
+            if args.kiosk_command == "export":
+                self.__cli.export()
+                return
             if args.kiosk_command == "wizard":
                 self.__cli.wizard()
                 return
@@ -86,8 +248,31 @@ class Arguments:
                 self.__cli.clear()
                 return
             print("No arguments provided.")
+        if args.command == "media":
+            if args.media_command == "list":
+                self.__cli.list_media(args.media_list_filters, args.media_list_search, args.media_list_offset, args.media_list_limit, args.media_list_format)
+                return
+            if args.media_command == "sync":
+                self.__cli.sync_media(args.media_sync_prune, args.media_sync_dry_run, args.media_sync_rescan)
+                return
+            if args.media_command == "dedup":
+                self.__cli.dedup_media(args.media_dedup_mode, args.media_dedup_dry_run, args.media_dedup_workers)
+                return
+            print("No arguments provided.")
         if args.command == "tools":
             if args.tools_command == "thumbnail":
-                self.__cli.thumbnail(args.tools_thumbnail_video_path, args.tools_thumbnail_media_path)
+                self.__cli.thumbnail(args.tools_thumbnail_video_path, args.tools_thumbnail_media_path, args.tools_thumbnail_workers, args.tools_thumbnail_force, args.tools_thumbnail_hash, args.tools_thumbnail_mode, args.tools_thumbnail_candidates, args.tools_thumbnail_sizes, args.tools_thumbnail_quality, args.tools_thumbnail_format, args.tools_thumbnail_timeout)
+                return
+            if args.tools_command == "transcode":
+                self.__cli.transcode(args.tools_transcode_workers, args.tools_transcode_force, args.tools_transcode_dry_run, args.tools_transcode_max_width, args.tools_transcode_max_height, args.tools_transcode_bitrate, args.tools_transcode_max_fps, args.tools_transcode_encoder, args.tools_transcode_keep_originals)
+                return
+            if args.tools_command == "optimize-images":
+                self.__cli.optimize_images(args.tools_optimize_workers, args.tools_optimize_force, args.tools_optimize_dry_run, args.tools_optimize_max_width, args.tools_optimize_max_height, args.tools_optimize_quality, args.tools_optimize_progressive, args.tools_optimize_keep_originals)
+                return
+            if args.tools_command == "watch":
+                self.__cli.watch(args.tools_watch_workers, args.tools_watch_settle, args.tools_watch_interval, args.tools_watch_poll, args.tools_watch_prune)
+                return
+            if args.tools_command == "preview":
+                self.__cli.preview(args.tools_preview_workers, args.tools_preview_force, args.tools_preview_frames, args.tools_preview_columns, args.tools_preview_width, args.tools_preview_sheet, args.tools_preview_loop)
                 return
             print("No arguments provided.")
\ No newline at end of file
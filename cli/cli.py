@@ -1,13 +1,19 @@
 from rich.console import Console
-from rich.table import Table
-from rich.tree import Tree
-from rich.prompt import Prompt, Confirm
 
 from config import Configuration, Items, Media
+from config.config import new_id
+from config.journal import Journal, document, lines
+from config.storage import lock, phase
+from .listing import Listing, rows
 
+import copy
 import os
+import sys
 
 console = Console()
+# Errors that stop a command before it prints anything; on stderr they do
+# not end up in JSON or CSV output on stdout.
+errors = Console(stderr=True)
 
 flags = {
     "de": "🇩🇪",
@@ -15,25 +21,62 @@ flags = {
 }
 
 class CLI:
-    def __init__(self, config: Configuration) -> None:
+    def __init__(self, config: Configuration, quiet: bool = False, section: str = "kiosk") -> None:
         self.config = config
+        self.quiet = quiet
+        self.section = section
+        self.name = Configuration.kiosk_name(section)
+        self.__sqlite = None
+        self.__journal = None
         self.check()
         self.prepare()
 
+    def __store(self):
+        if self.config.get_str(self.section, "storage", "json") != "sqlite":
+            return None
+        if self.__sqlite is None:
+            from config.sqlite import SqliteStore
+            __default = os.path.join(os.path.dirname(self.config.get(self.section, "items_config_file")), "shifiq.db")
+            self.__sqlite = SqliteStore(self.config.get_path(self.section, "database_file", __default), {
+                "items": self.config.get(self.section, "items_config_file"),
+                "media": self.config.get(self.section, "media_config_file")
+            })
+        return self.__sqlite
+
+    def __history(self) -> Journal:
+        __retention = self.config.get_int(self.section, "journal_retention", 100)
+        if __retention <= 0:
+            return None
+        if self.__journal is None:
+            __default = os.path.join(os.path.dirname(self.config.get(self.section, "items_config_file")), ".shifiq-journal.jsonl")
+            self.__journal = Journal(self.config.get_path(self.section, "journal_file", __default), __retention, " ".join(sys.argv[1:]))
+        return self.__journal
+
+    def __items(self) -> Items:
+        return Items(self.config.get(self.section, "items_config_file"), self.__store(), self.__history())
+
+    def __media(self) -> Media:
+        return Media(self.config.get(self.section, "media_config_file"), self.config.get(self.section, "media_directory"), self.__store(), self.__history())
+
+    def __label(self) -> str:
+        if self.section == "kiosk":
+            return ""
+        return f" ({self.name})"
+
     def check(self) -> None:
         files = ["items_config_file", "media_config_file"]
         folders = ["media_directory"]
         for file in files:
-            if not os.path.exists(self.config.get("kiosk", file)):
-                console.print(f"❌ Configuration file not found: {file}", style="red")
+            if not os.path.exists(self.config.get(self.section, file)):
+                errors.print(f"❌ Configuration file not found: {file}{self.__label()}", style="red")
                 exit(1)
         for folder in folders:
-            if not os.path.exists(self.config.get("kiosk", folder)):
-                console.print(f"❌ Directory not found: {folder}", style="red")
+            if not os.path.exists(self.config.get(self.section, folder)):
+                errors.print(f"❌ Directory not found: {folder}{self.__label()}", style="red")
                 exit(1)
     
     def prepare(self) -> None:
-        __media_directory = self.config.get("kiosk", "media_directory")
+        __media_directory = self.config.get(self.section, "media_directory")
         __media_directories = ["images", "videos", "thumbnails"]
         count = 0
         for directory in __media_directories:
@@ -44,7 +87,7 @@ class CLI:
                 except Exception as e:
                     console.print(f"❌ Error creating directory: {directory}", style="red")
                     exit(1)
-        if count > 0:
+        if count > 0 and not self.quiet:
             console.print(f"✅ {count} directories created.", style="green")
             print()
 
@@ -61,28 +104,29 @@ class CLI:
         for key, value in __section.items():
             console.print(f"🛠️ {key}: {value}")
 
-    def add_item(self, language: str, title: str, link: str, type: str, position: int = 0) -> None:
+    def add_item(self, language: str, title: str, link: str, type: str, position: int = 0) -> bool:
         __language = [language]
-        __path = self.config.get("kiosk", "items_config_file")
         if language == "all":
             __language = ["de", "en"]
         __result = []
-        __de_length = len(Items(__path).get("de"))
-        __en_length = len(Items(__path).get("en"))
-        if position > 1:
-            if position > __de_length or position > __en_length:
-                console.print("❌ Position is out of range.", style="red")
-                return
-        for lang in __language:
-            items = Items(__path)
-            __add_result = items.add(lang, title, link, type, position)
-            if __add_result is not None:
-                __result.append(__add_result)
-            else:
-                return
+        with self.__items() as items:
+            if position > 1:
+                if position > items.de_len or position > items.en_len:
+                    console.print("❌ Position is out of range.", style="red")
+                    return False
+            # Both languages share one id, which pairs the de/en tiles.
+            __id = new_id()
+            for lang in __language:
+                __add_result = items.add(lang, title, link, type, position, __id)
+                if __add_result is not None:
+                    __result.append(__add_result)
+                else:
+                    return False
+            items.flush()
         if len(__result) == 0:
             console.print("❌ No items added.", style="red")
-            return
+            return False
+        from rich.table import Table
         table = Table()
         table.add_column("ID", justify="right", style="cyan")
         table.add_column("Title", style="magenta")
@@ -90,128 +134,508 @@ class CLI:
         table.add_column("Type", style="yellow")
         table.add_column("Language", style="blue")
 
-        for idx, item in enumerate(__result, 1):
-            table.add_row(str(idx), item["title"], item["link"], item["type"], item["language"])
-        
-        console.print(table)
+        for item in __result:
+            table.add_row(item["id"], item["title"], item["link"], item["type"], item["language"])
+
+        with phase("render"):
+            console.print(table)
         print()
+        return True
 
     def add_media(self, title: str, file: str, type: str, description: str = None) -> None:
-        __path = self.config.get("kiosk", "media_config_file")
-        __media_directory = self.config.get("kiosk", "media_directory")
-        media = Media(__path, __media_directory)
-        console.print(media.add(title, file, type, description))
+        with self.__media() as media:
+            console.print(media.add(title, file, type, description))
+            media.flush()
         print()
         console.print("✅ Media added successfully.", style="green")
         print()
 
-    def remove_item(self, language: str, id: int, output: bool = True) -> bool:
+    def remove_item(self, language: str, id: str, output: bool = True) -> bool:
         __language = [language]
-        __path = self.config.get("kiosk", "items_config_file")
         if language == "all":
             __language = ["de", "en"]
-        for lang in __language:
-            items = Items(__path)
-            try:
-                items.remove(lang, id)
-            except Exception as e:
-                return False
-            if output:
-                console.print(f"✅ Item removed: {id}")
+        with self.__items() as items:
+            for lang in __language:
+                __position = items.resolve(lang, id)
+                if __position is None or not items.remove(lang, __position):
+                    return False
+                if output:
+                    console.print(f"✅ Item removed: {id}")
+            items.flush()
         return True
     
-    def remove_media(self, id: int) -> None:
-        __path = self.config.get("kiosk", "media_config_file")
-        __media_directory = self.config.get("kiosk", "media_directory")
-        media = Media(__path, __media_directory)
-        media.remove(id)
-        console.print("✅ Media removed successfully.", style="green")
-
-    def list_items(self) -> None:
-        __path = self.config.get("kiosk", "items_config_file")
-        items = Items(__path)
-        for lang in ["de", "en"]:
-            table = Table(title=f"{flags.get(lang)} {lang.upper()}: Tiles")
-            table.add_column("ID", justify="right", style="cyan")
-            table.add_column("Title", style="magenta")
-            table.add_column("Link", style="green")
-            table.add_column("Type", style="yellow")
-
-            for idx, item in enumerate(items.get(lang), 1):
-                table.add_row(str(idx), item["title"], item["link"], item["type"])
-
-            console.print(table)
-            print()
+    def move_item(self, language: str, id: str, to: int) -> bool:
+        __language = [language]
+        if language == "all":
+            __language = ["de", "en"]
+        with self.__items() as items:
+            for lang in __language:
+                __position = items.resolve(lang, id)
+                if __position is None or not items.move(lang, __position, to):
+                    return False
+            items.flush()
+        console.print(f"✅ Item moved: {id} → {to}")
+        return True
 
-    def list_media(self) -> None:
-        __path = self.config.get("kiosk", "media_config_file")
-        __media_directory = self.config.get("kiosk", "media_directory")
-        media = Media(__path, __media_directory)
-        console.print(media.media)
-        table = Table(title="🖼️ Media")
-        table.add_column("ID", justify="right", style="cyan")
-        table.add_column("Title", style="magenta")
-        table.add_column("File", style="green")
-        table.add_column("Type", style="yellow")
-        table.add_column("Description", style="red")
+    def reorder_items(self, language: str, order: list) -> bool:
+        __language = [language]
+        if language == "all":
+            __language = ["de", "en"]
+        with self.__items() as items:
+            for lang in __language:
+                __order = [items.resolve(lang, id) for id in order]
+                if None in __order or not items.reorder(lang, __order):
+                    return False
+            items.flush()
+        console.print(f"✅ Items reordered: {', '.join(str(id) for id in order)}")
+        return True
 
-        for idx, item in enumerate(media.get(), 1):
-            if "description" not in item:
-                item["description"] = ""
-            table.add_row(str(idx), item["title"], item["link"], item["type"], item["description"])
+    def remove_media(self, id: str) -> None:
+        with self.__media() as media:
+            __position = media.resolve(id)
+            if __position is None or not media.remove(__position):
+                return
+            media.flush()
+        console.print("✅ Media removed successfully.", style="green")
 
-        console.print(table)
-        print()
-    
-    def edit_item(self, id: int, language: str, title: str, link: str, type: str) -> None:
-        __path = self.config.get("kiosk", "items_config_file")
-        items = Items(__path)
-        items.edit(id, language, title, link, type)
+    @staticmethod
+    def item_listing(format: str, fleet: bool = False) -> Listing:
+        __columns = [("#", "position", "dim"), ("ID", "id", "cyan"), ("Title", "title", "magenta"), ("Link", "link", "green"), ("Type", "type", "yellow")]
+        if format != "table":
+            __columns.append(("Language", "language", None))
+        if fleet:
+            __columns.insert(0, ("Kiosk", "kiosk", "blue"))
+        return Listing(format, __columns)
+
+    def list_items(self, language: str = "all", filters: list = None, search: str = None, offset: int = 0, limit: int = None, format: str = "table", listing: Listing = None) -> None:
+        items = self.__items()
+        # A fleet passes one listing for all kiosks and closes it itself.
+        __listing = listing or self.item_listing(format)
+        __extra = {"kiosk": self.name} if listing is not None else {}
+        for lang in ["de", "en"] if language == "all" else [language]:
+            __listing.write(f"{flags.get(lang)} {lang.upper()}: Tiles{self.__label()}", rows(items.get(lang), filters, search, offset, limit), dict(__extra, language=lang))
+        if listing is None:
+            __listing.close()
+
+    def list_media(self, filters: list = None, search: str = None, offset: int = 0, limit: int = None, format: str = "table") -> None:
+        media = self.__media()
+        listing = Listing(format, [("#", "position", "dim"), ("ID", "id", "cyan"), ("Title", "title", "magenta"), ("File", "link", "green"), ("Type", "type", "yellow"), ("Description", "description", "red")])
+        listing.write(f"🖼️ Media{self.__label()}", rows(media.get(), filters, search, offset, limit))
+        listing.close()
+
+    def edit_item(self, id: str, language: str, title: str, link: str, type: str) -> bool:
+        __language = [language]
+        if language == "all":
+            __language = ["de", "en"]
+        with self.__items() as items:
+            for lang in __language:
+                __position = items.resolve(lang, id)
+                if __position is None:
+                    return False
+                items.edit(__position, lang, title, link, type)
+            items.flush()
         console.print(f"✅ Item edited: {id}")
+        return True
 
-    def edit_media(self, id: int, title: str, file: str, type: str, description: str = None) -> None:
-        __path = self.config.get("kiosk", "media_config_file")
-        __media_directory = self.config.get("kiosk", "media_directory")
-        media = Media(__path, __media_directory)
-        media.edit(id, title, file, type, description)
+    def edit_media(self, id: str, title: str, file: str, type: str, description: str = None) -> None:
+        with self.__media() as media:
+            __position = media.resolve(id)
+            if __position is None:
+                return
+            media.edit(__position, title, file, type, description)
+            media.flush()
         console.print(f"✅ Media edited: {id}")
         
     def bulk_remove(self, ids: list) -> None:
-        __path = self.config.get("kiosk", "items_config_file")
-        items = Items(__path)
-        for lang in ["de", "en"]:
-            for id in ids:
-                items.remove(lang, id)
+        with self.__items() as items:
+            for lang in ["de", "en"]:
+                # Resolve every id before removing anything, then go from the
+                # highest position down so removals do not shift later ones.
+                __positions = [items.resolve(lang, id) for id in ids]
+                for position in sorted(set(position for position in __positions if position is not None), reverse=True):
+                    items.remove(lang, position)
+            items.flush()
         console.print("✅ Items removed successfully.", style="green")
 
     def clear(self) -> None:
-        __path = self.config.get("kiosk", "items_config_file")
-        items = Items(__path)
-        items.clear()
+        with self.__items() as items:
+            items.clear()
+            items.flush()
         console.print("✅ All items removed.")
 
     def clear_media(self) -> None:
-        __path = self.config.get("kiosk", "media_config_file")
-        __media_directory = self.config.get("kiosk", "media_directory")
-        media = Media(__path, __media_directory)
-        media.clear()
+        with self.__media() as media:
+            media.clear()
+            media.flush()
         console.print("✅ All media removed.")
 
-    def thumbnail(self, source: str = None, target: str = None) -> None:
+    def export(self) -> bool:
+        store = self.__store()
+        if store is None:
+            console.print("ℹ️ The JSON files are the storage already; nothing to export.", style="yellow")
+            return True
+        __items_path = self.config.get(self.section, "items_config_file")
+        __media_path = self.config.get(self.section, "media_config_file")
+        with lock(__items_path), lock(__media_path):
+            store.export("items", Items.EMPTY, __items_path)
+            store.export("media", Media.EMPTY, __media_path)
+        if not self.quiet:
+            console.print(f"✅ Exported {__items_path} and {__media_path}.", style="green")
+        return True
+
+    def check_links(self, concurrency: int = None, timeout: float = None, refresh: bool = False, all: bool = False) -> bool:
+        from tools.links import Links
+        items = self.__items()
+        __default = os.path.join(os.path.dirname(self.config.get(self.section, "items_config_file")), ".shifiq-links.json")
+        links = Links(
+            self.config.get(self.section, "media_directory"),
+            self.config.get_path(self.section, "link_cache_file", __default),
+            self.config.get_int(self.section, "link_cache_ttl", 3600),
+            concurrency or self.config.get_int(self.section, "link_check_concurrency", 16),
+            timeout or self.config.get_float(self.section, "link_check_timeout", 10)
+        )
+        __tiles = [(lang, position, item) for lang in ["de", "en"] for position, item in enumerate(items.get(lang), 1)]
+        __results = links.check([item["link"] for _, _, item in __tiles], refresh)
+        links.save()
+        __broken = [tile for tile in __tiles if not __results[tile[2]["link"]]["ok"]]
+
+        from rich.table import Table
+        table = Table(title=f"🔗 Links{self.__label()}")
+        table.add_column("Language", style="dim")
+        table.add_column("#", justify="right", style="dim")
+        table.add_column("ID", style="cyan")
+        table.add_column("Title", style="magenta")
+        table.add_column("Link", style="green")
+        table.add_column("Status")
+        for lang, position, item in __tiles if all else __broken:
+            result = __results[item["link"]]
+            __status = "[green]✅ ok[/green]" if result["ok"] else "[red]❌ " + " ".join(str(part) for part in [result["status"], result["error"]] if part) + "[/red]"
+            table.add_row(lang, str(position), item["id"], item["title"], item["link"], __status + (" (cached)" if result["cached"] else ""))
+        if all or len(__broken) > 0:
+            with phase("render"):
+                console.print(table)
+            print()
+        if not self.quiet:
+            console.print(f"🔗 {len(__results)} links checked ({links.cached} from cache).")
+        if len(__broken) > 0:
+            console.print(f"❌ {len(__broken)} tiles have a broken link{self.__label()}.", style="red")
+            return False
+        console.print(f"✅ All tile links are reachable{self.__label()}.", style="green")
+        return True
+
+    def history(self, limit: int = 20) -> None:
+        journal = self.__history()
+        if journal is None:
+            console.print("❌ The change journal is disabled (journal_retention = 0).", style="red")
+            return
+        from rich.table import Table
+        import datetime
+        table = Table(title=f"🕓 History{self.__label()}")
+        table.add_column("Seq", justify="right", style="cyan")
+        table.add_column("Time", style="dim")
+        table.add_column("Document", style="yellow")
+        table.add_column("Command", style="magenta")
+        table.add_column("Changes", justify="right", style="green")
+        for entry in journal.entries()[-limit:]:
+            __removed = sum(len(change[4]) for change in entry["changes"])
+            __added = sum(len(change[5]) for change in entry["changes"])
+            table.add_row(str(entry["seq"]), datetime.datetime.fromtimestamp(entry["time"]).strftime("%Y-%m-%d %H:%M:%S"), entry["document"], entry["label"] or "", f"+{__added} -{__removed}")
+        with phase("render"):
+            console.print(table)
+        print()
+
+    def undo(self, steps: int = 1, force: bool = False) -> bool:
+        journal = self.__history()
+        __commands = journal.commands() if journal is not None else []
+        if len(__commands) == 0:
+            console.print("❌ Nothing to undo.", style="red")
+            return False
+        return self.restore(__commands[-min(steps, len(__commands))][0]["seq"] - 1, force)
+
+    def restore(self, at: int, force: bool = False) -> bool:
+        journal = self.__history()
+        if journal is None:
+            console.print("❌ The change journal is disabled (journal_retention = 0).", style="red")
+            return False
+        # Both documents stay locked while the journal is read and rewound, so
+        # no other writer can append in between.
+        with self.__items() as items, self.__media() as media:
+            __entries = [entry for entry in journal.entries() if entry["seq"] > at]
+            if len(__entries) == 0:
+                console.print(f"❌ Nothing recorded after #{at}.", style="red")
+                return False
+            __oldest = journal.entries()[0]["seq"]
+            if at < __oldest - 1:
+                console.print(f"⚠️ The journal only goes back to #{__oldest}; restoring the state before it.", style="yellow")
+            __documents = {"items": lines(items.items), "media": lines(media.media)}
+            for entry in reversed(__entries):
+                __reverted = journal.revert(entry, __documents[entry["document"]], force)
+                if __reverted is None:
+                    console.print(f"❌ The {entry['document']} file has changed since #{entry['seq']} was recorded; use --force to revert anyway.", style="red")
+                    return False
+                __documents[entry["document"]] = __reverted
+            items.items = document(__documents["items"], Items.EMPTY)
+            items.dirty = True
+            items.flush(record=False)
+            media.media = document(__documents["media"], Media.EMPTY)
+            media.dirty = True
+            media.flush(record=False)
+            journal.drop(set(entry["seq"] for entry in __entries))
+        console.print(f"✅ Reverted {len(__entries)} change(s); now at #{max(at, __oldest - 1)}.", style="green")
+        return True
+
+    def publish(self, target: str = None, base_url: str = None) -> bool:
+        __default = os.path.join(os.path.dirname(self.config.get(self.section, "items_config_file")), "publish")
+        __target = target or self.config.get_path(self.section, "publish_directory", __default)
+        from tools.publish import Publish, brotli, foreign
+        if foreign(__target):
+            console.print(f"❌ {__target} is not empty and holds no published bundle; choose an empty directory.", style="red")
+            return False
+        publish = Publish(__target, self.config.get(self.section, "media_directory"), base_url or self.config.get_str(self.section, "publish_base_url", "/"))
+        items = self.__items()
+        media = self.__media()
+        publish.items(items.items)
+        publish.media(media.media)
+        manifest = publish.save()
+        if brotli is None and not self.quiet:
+            console.print("⚠️ brotli is not installed (pip install brotli); only .gz files were written.", style="yellow")
+        if not self.quiet:
+            from rich.table import Table
+            table = Table(title=f"📦 Bundle {manifest['version']}{self.__label()}")
+            table.add_column("File", style="cyan")
+            table.add_column("Published as", style="green")
+            table.add_column("Size", justify="right", style="yellow")
+            table.add_column("gzip", justify="right", style="dim")
+            table.add_column("br", justify="right", style="dim")
+            for name, entry in manifest["files"].items():
+                table.add_row(name, entry["path"], str(entry["size"]), str(entry["gzip"]["size"]), str(entry["br"]["size"]) if "br" in entry else "")
+            with phase("render"):
+                console.print(table)
+            print()
+        console.print(f"✅ Published {__target}: {len(manifest['assets'])} assets, {publish.written} new files, {manifest['removed']} old files removed.", style="green")
+        return True
+
+    def apply(self, file: str = "-", format: str = "auto", dry_run: bool = False) -> None:
+        from config.batch import Batch, BatchError, parse, diff
+        __items_path = self.config.get(self.section, "items_config_file")
+        __media_path = self.config.get(self.section, "media_config_file")
+        if file == "-":
+            __text = sys.stdin.read()
+        else:
+            if format == "auto" and file.endswith((".yaml", ".yml")):
+                format = "yaml"
+            with open(file, "r") as stream:
+                __text = stream.read()
+        with self.__items() as items, self.__media() as media:
+            __before = (copy.deepcopy(items.items), copy.deepcopy(media.media))
+            try:
+                __operations = parse(__text, format)
+                Batch(items, media).apply(__operations)
+            except BatchError as e:
+                for error in e.errors:
+                    console.print(f"❌ {error}", style="red")
+                console.print("🚧 No changes were written.", style="bold red")
+                exit(1)
+            if dry_run:
+                __lines = diff(__before[0], items.items, os.path.basename(__items_path)) + diff(__before[1], media.media, os.path.basename(__media_path))
+                for line in __lines:
+                    style = "green" if line.startswith("+") else "red" if line.startswith("-") else None
+                    console.print(line, style=style, markup=False, highlight=False)
+                console.print(f"🔎 Dry run: {len(__operations)} operations validated, nothing written.", style="yellow")
+                return
+            items.flush()
+            media.flush()
+        console.print(f"✅ {len(__operations)} operations applied.", style="green")
+
+    def sync_media(self, prune: bool = False, dry_run: bool = False, rescan: bool = False) -> bool:
+        __media_directory = self.config.get(self.section, "media_directory")
+        from tools.library import Library
+        library = Library(__media_directory, rescan)
+        with self.__media() as media:
+            __report = library.sync(media, prune)
+            if not dry_run:
+                media.flush()
+                library.save()
+        for link in __report["added"]:
+            console.print(f"➕ {link}", style="green")
+        for link in __report["linked"]:
+            console.print(f"🔗 {link}", style="cyan")
+        for link in __report["missing"]:
+            console.print(f"{'🗑 ' if prune else '⚠️'} {link} is missing", style="red" if prune else "yellow")
+        for link in __report["unlinked"]:
+            console.print(f"🖼️ {link} has no thumbnail", style="dim")
+        print()
+        __summary = f"{len(__report['added'])} added, {len(__report['missing'])} missing, {len(__report['linked'])} thumbnails linked ({library.scanned} directories scanned)"
+        if dry_run:
+            console.print(f"🔎 Dry run: {__summary}, nothing written.", style="yellow")
+        else:
+            console.print(f"✅ Media synchronized: {__summary}.", style="green")
+        return True
+
+    def dedup_media(self, mode: str = None, dry_run: bool = False, workers: int = None) -> bool:
+        __media_directory = self.config.get(self.section, "media_directory")
+        from tools.dedup import Dedup
+        dedup = Dedup(__media_directory, workers)
+        with self.__media() as media:
+            __groups = dedup.groups(set(entry["link"] for entry in media.get()))
+            __wasted = 0
+            for group in __groups:
+                __size = os.path.getsize(os.path.join(__media_directory, group[0]))
+                __wasted += __size * (len(group) - 1)
+                console.print(f"🧬 {group[0]}", style="cyan")
+                for path in group[1:]:
+                    console.print(f"   ↳ {path}", style="dim")
+            if len(__groups) > 0:
+                print()
+            __rewritten = dedup.rewrite(media, __groups)
+            __summary = f"{len(__groups)} duplicate groups, {__wasted / 1024 / 1024:.1f} MiB reclaimable, {__rewritten} media links rewritten ({dedup.hashed} files fully hashed)"
+            if dry_run:
+                console.print(f"🔎 Dry run: {__summary}, nothing written.", style="yellow")
+                return True
+            media.flush()
+            if mode is not None:
+                __resolved = dedup.resolve(__groups, mode)
+                __summary = f"{__summary}, {__resolved} copies {'hard-linked' if mode == 'link' else 'deleted'}"
+        console.print(f"✅ Deduplicated: {__summary}.", style="green")
+        return True
+
+    def __thumbnailer(self, source: str, target: str, hash: bool = False, mode: str = "fast", candidates: int = 3, sizes: list = None, quality: int = None, format: str = None):
+        if sizes is None:
+            sizes = [int(size) for size in self.config.get_list(self.section, "thumbnail_sizes", [])]
+        if quality is None:
+            quality = self.config.get_int(self.section, "thumbnail_quality", 85)
+        if format is None:
+            format = self.config.get_str(self.section, "thumbnail_format", "jpg")
+        from tools.thumbnail import Thumbnail
+        return Thumbnail(source, target, hash=hash, mode=mode, candidates=candidates, sizes=sizes, quality=quality, format=format)
+
+    def thumbnail(self, source: str = None, target: str = None, workers: int = 1, force: bool = False, hash: bool = False, mode: str = "fast", candidates: int = 3, sizes: list = None, quality: int = None, format: str = None, timeout: float = None) -> bool:
         __source = source
         __target = target
         if source is None:
-            __source = f"{self.config.get('kiosk', 'media_directory')}/videos"
+            __source = f"{self.config.get(self.section, 'media_directory')}/videos"
         if target is None:
-            __target = f"{self.config.get('kiosk', 'media_directory')}/thumbnails"
-        from tools.thumbnail import Thumbnail
-        thumbnail = Thumbnail(__source, __target)
-        thumbnail.generate()
+            __target = f"{self.config.get(self.section, 'media_directory')}/thumbnails"
+        thumbnail = self.__thumbnailer(__source, __target, hash, mode, candidates, sizes, quality, format)
+        if timeout is None:
+            timeout = self.config.get_float(self.section, "thumbnail_timeout", 120)
+        # A video that takes longer is treated as a hung decoder; 0 disables the limit.
+        with phase("thumbnails"):
+            __results = thumbnail.generate(workers, force, timeout if timeout > 0 else None)
+        __failed = [result for result in __results if result["error"] is not None]
+        print()
+        if len(__failed) > 0:
+            console.print(f"⚠️ {len(__results) - len(__failed)} thumbnails generated, {len(__failed)} failed.", style="yellow")
+            return False
         console.print("✅ Thumbnails generated successfully.", style="green")
+        return True
+
+    def transcode(self, workers: int = 1, force: bool = False, dry_run: bool = False, max_width: int = None, max_height: int = None, bitrate: int = None, max_fps: int = None, encoder: str = None, keep_originals: bool = True) -> bool:
+        __media_directory = self.config.get(self.section, "media_directory")
+        from tools.transcode import Transcode
+        transcode = Transcode(
+            f"{__media_directory}/videos",
+            os.path.join(__media_directory, "originals", "videos") if keep_originals else None,
+            max_width or self.config.get_int(self.section, "transcode_max_width", 1920),
+            max_height or self.config.get_int(self.section, "transcode_max_height", 1080),
+            bitrate or self.config.get_int(self.section, "transcode_bitrate", 6000),
+            max_fps or self.config.get_int(self.section, "transcode_max_fps", 30),
+            encoder or self.config.get_str(self.section, "transcode_encoder", "auto")
+        )
+        if dry_run:
+            __pending = transcode.pending(force)
+            for video in __pending:
+                console.print(f"🎞️ {video['name']}", style="cyan")
+            print()
+            console.print(f"🔎 Dry run: {len(__pending)} videos would be checked and transcoded with {transcode.settings['encoder']}, nothing written.", style="yellow")
+            return True
+        with phase("transcode"):
+            __results = transcode.generate(workers, force)
+        __failed = [result for result in __results if result["error"] is not None]
+        __transcoded = [result for result in __results if result["error"] is None and not result["skipped"]]
+        print()
+        if len(__failed) > 0:
+            console.print(f"⚠️ {len(__transcoded)} videos transcoded, {len(__failed)} failed.", style="yellow")
+            return False
+        console.print(f"✅ {len(__transcoded)} videos transcoded, {len(__results) - len(__transcoded)} already fit.", style="green")
+        return True
+
+    def optimize_images(self, workers: int = 1, force: bool = False, dry_run: bool = False, max_width: int = None, max_height: int = None, quality: int = None, progressive: bool = None, keep_originals: bool = True) -> bool:
+        __media_directory = self.config.get(self.section, "media_directory")
+        from tools.images import Images
+        images = Images(
+            f"{__media_directory}/images",
+            os.path.join(__media_directory, "originals", "images") if keep_originals else None,
+            max_width or self.config.get_int(self.section, "image_max_width", 1920),
+            max_height or self.config.get_int(self.section, "image_max_height", 1080),
+            quality or self.config.get_int(self.section, "image_quality", 82),
+            progressive if progressive is not None else self.config.get_bool(self.section, "image_progressive", True)
+        )
+        if dry_run:
+            __pending = images.pending(force)
+            for image in __pending:
+                console.print(f"🖼️ {image['name']}", style="cyan")
+            print()
+            console.print(f"🔎 Dry run: {len(__pending)} images would be optimized, nothing written.", style="yellow")
+            return True
+        with phase("optimize"):
+            __results = images.generate(workers, force)
+        __failed = [result for result in __results if result["error"] is not None]
+        __saved = sum(result["before"] - result["after"] for result in __results if result["error"] is None)
+        print()
+        if len(__failed) > 0:
+            console.print(f"⚠️ {len(__results) - len(__failed)} images optimized, {len(__failed)} failed.", style="yellow")
+            return False
+        console.print(f"✅ {len(__results)} images optimized, {__saved / 1024 / 1024:.1f} MB saved.", style="green")
+        return True
+
+    def watch(self, workers: int = 1, settle: float = 2.0, interval: float = 1.0, polling: bool = False, prune: bool = False) -> bool:
+        __media_directory = self.config.get(self.section, "media_directory")
+        from tools.library import Library
+        from tools.watch import Inotify, Watcher
+        thumbnail = self.__thumbnailer(f"{__media_directory}/videos", f"{__media_directory}/thumbnails")
+        library = Library(__media_directory)
+
+        def catalog() -> None:
+            with self.__media() as media:
+                __report = library.sync(media, prune)
+                media.flush()
+                library.save()
+            for link in __report["added"]:
+                console.print(f"➕ {link}", style="green")
+            for link in __report["linked"]:
+                console.print(f"🔗 {link}", style="cyan")
+            for link in __report["missing"]:
+                console.print(f"{'🗑 ' if prune else '⚠️'} {link} is missing", style="red" if prune else "yellow")
+
+        __timeout = self.config.get_float(self.section, "thumbnail_timeout", 120)
+        watcher = Watcher(__media_directory, thumbnail, catalog, workers, settle, interval, polling, __timeout if __timeout > 0 else None)
+        console.print(f"👀 Watching {__media_directory}{self.__label()} ({'inotify' if isinstance(watcher.backend, Inotify) else 'polling'}). Press Ctrl+C to stop.", style="cyan")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            print()
+            console.print("👋 Stopped watching.", style="cyan")
+        return True
+
+    def preview(self, workers: int = 1, force: bool = False, frames: int = 12, columns: int = 4, width: int = 320, sheet: bool = True, loop: bool = False) -> bool:
+        __media_directory = self.config.get(self.section, "media_directory")
+        from tools.preview import Preview
+        preview = Preview(f"{__media_directory}/videos", f"{__media_directory}/thumbnails", frames, columns, width, sheet, loop)
+        with phase("preview"):
+            __results = preview.generate(workers, force)
+        __failed = [result for result in __results if result["error"] is not None]
+        print()
+        if len(__failed) > 0:
+            console.print(f"⚠️ {len(__results) - len(__failed)} previews generated, {len(__failed)} failed.", style="yellow")
+            return False
+        console.print("✅ Previews generated successfully.", style="green")
+        return True
 
     def wizard(self) -> None:
-        __items_path = self.config.get("kiosk", "items_config_file")
-        __media_path = self.config.get("kiosk", "media_config_file")
+
+        from rich.tree import Tree
+        from rich.prompt import Prompt, Confirm
 
         while True:
             menu = Tree("🧙 Kiosk Wizard")
@@ -0,0 +1,88 @@
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from rich.console import Console
+
+from config import Configuration
+from .cli import CLI
+
+console = Console()
+# The summary goes to stderr, so JSON and CSV output on stdout stays usable.
+errors = Console(stderr=True)
+
+# Commands that can run against several kiosks at once.
+COMMANDS = ["add_item", "edit_item", "remove_item", "list_items", "move_item", "reorder_items", "export", "publish", "check_links", "thumbnail", "preview", "transcode", "optimize_images"]
+
+class Fleet:
+    def __init__(self, config: Configuration, sections: list, quiet: bool = False, workers: int = None) -> None:
+        self.config = config
+        self.sections = sections
+        self.quiet = quiet
+        self.workers = workers or len(sections)
+
+    def __getattr__(self, name: str):
+        if name not in COMMANDS:
+            def unsupported(*args, **kwargs) -> None:
+                console.print("❌ This command can only run against a single kiosk (use --kiosk NAME).", style="red")
+                exit(1)
+            return unsupported
+        return lambda *args, **kwargs: self.run(name, *args, **kwargs)
+
+    def __target(self, section: str, command: str, args: tuple, kwargs: dict) -> dict:
+        result = {
+            "kiosk": Configuration.kiosk_name(section),
+            "ok": True,
+            "error": None
+        }
+        __start = time.perf_counter()
+        try:
+            cli = CLI(self.config, self.quiet, section)
+            if getattr(cli, command)(*args, **kwargs) is False:
+                result["ok"] = False
+        except SystemExit as e:
+            # CLI.check() exits on missing files; that only fails this target.
+            result["ok"] = False
+            result["error"] = str(e.code) if e.code not in [None, 0, 1] else None
+        except Exception as e:
+            result["ok"] = False
+            result["error"] = str(e)
+        result["seconds"] = time.perf_counter() - __start
+        return result
+
+    def list_items(self, language: str = "all", filters: list = None, search: str = None, offset: int = 0, limit: int = None, format: str = "table") -> list:
+        # One listing for the whole fleet: a single JSON array or CSV header
+        # and a kiosk column. Kiosks are listed one after another so their
+        # rows never interleave.
+        listing = CLI.item_listing(format, True)
+        try:
+            return self.__run("list_items", (language, filters, search, offset, limit, format), {"listing": listing}, 1)
+        finally:
+            listing.close()
+
+    def run(self, command: str, *args, **kwargs) -> list:
+        return self.__run(command, args, kwargs, self.workers)
+
+    def __run(self, command: str, args: tuple, kwargs: dict, workers: int) -> list:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            __futures = [pool.submit(self.__target, section, command, args, kwargs) for section in self.sections]
+            __results = [future.result() for future in __futures]
+        self.summary(__results)
+        if any(not result["ok"] for result in __results):
+            exit(1)
+        return __results
+
+    def summary(self, results: list) -> None:
+        from rich.table import Table
+        table = Table(title="🏬 Kiosks")
+        table.add_column("Kiosk", style="cyan")
+        table.add_column("Status")
+        table.add_column("Time", justify="right", style="yellow")
+        table.add_column("Error", style="red")
+        for result in results:
+            __status = "[green]✅ ok[/green]" if result["ok"] else "[red]❌ failed[/red]"
+            table.add_row(result["kiosk"], __status, f"{result['seconds']:.2f}s", result["error"] or "")
+        print(file=sys.stderr)
+        errors.print(table)
+        print(file=sys.stderr)
@@ -0,0 +1,86 @@
+import csv
+import itertools
+import json
+import sys
+
+from rich.console import Console
+
+from config.storage import phase
+
+console = Console()
+
+# Rows rendered per rich table; bigger listings are printed chunk by chunk so
+# the whole catalog never sits in one table.
+CHUNK = 500
+
+def rows(entries: list, filters: list = None, search: str = None, offset: int = 0, limit: int = None):
+    __filters = filters or []
+    __search = search.lower() if search else None
+    __matches = (
+        (position, entry) for position, entry in enumerate(entries, 1)
+        if all(str(entry.get(key, "")) == value for key, value in __filters)
+        and (__search is None or any(__search in str(entry.get(key, "")).lower() for key in ["id", "title", "link", "description"]))
+    )
+    return itertools.islice(__matches, offset, None if limit is None else offset + limit)
+
+class Listing:
+    def __init__(self, format: str, columns: list) -> None:
+        # columns: (header, key, style)
+        self.format = format
+        self.columns = columns
+        self.__first = True
+        self.__csv = None
+        if format == "json":
+            sys.stdout.write("[")
+        if format == "csv":
+            self.__csv = csv.writer(sys.stdout)
+            self.__csv.writerow([key for _, key, _ in columns])
+
+    def __values(self, position: int, entry: dict, extra: dict) -> list:
+        __entry = dict(entry, position=position, **extra)
+        return [str(__entry.get(key, "")) for _, key, _ in self.columns]
+
+    def __table(self, title: str, show_header: bool):
+        from rich.table import Table
+        table = Table(title=title, show_header=show_header)
+        for header, _, style in self.columns:
+            table.add_column(header, style=style, justify="right" if header == "#" else "left")
+        return table
+
+    def write(self, title: str, rows, extra: dict = None) -> int:
+        # Rows are produced lazily, so filtering is timed as part of this.
+        with phase("render"):
+            return self.__write(title, rows, extra)
+
+    def __write(self, title: str, rows, extra: dict = None) -> int:
+        __extra = extra or {}
+        count = 0
+        if self.format == "json":
+            for position, entry in rows:
+                sys.stdout.write(("\n  " if self.__first else ",\n  ") + json.dumps(dict(entry, position=position, **__extra), ensure_ascii=False))
+                self.__first = False
+                count += 1
+            return count
+        if self.format == "csv":
+            for position, entry in rows:
+                self.__csv.writerow(self.__values(position, entry, __extra))
+                count += 1
+            return count
+        while True:
+            __chunk = list(itertools.islice(rows, CHUNK))
+            if len(__chunk) == 0 and count > 0:
+                break
+            table = self.__table(title if count == 0 else None, count == 0)
+            for position, entry in __chunk:
+                table.add_row(*self.__values(position, entry, __extra))
+            console.print(table)
+            count += len(__chunk)
+            if len(__chunk) < CHUNK:
+                break
+        print()
+        return count
+
+    def close(self) -> None:
+        if self.format == "json":
+            sys.stdout.write("\n]\n" if not self.__first else "]\n")
+        sys.stdout.flush()
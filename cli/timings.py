@@ -0,0 +1,66 @@
+import contextlib
+import json
+import sys
+import time
+
+class Timings:
+    def __init__(self, started: float = None) -> None:
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = {}
+        self.__last = self.started
+        self.__pending = 0.0
+        self.__stack = []
+
+    def __split(self) -> float:
+        __now = time.perf_counter()
+        __elapsed = __now - self.__last
+        self.__last = __now
+        return __elapsed
+
+    def __add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def mark(self, name: str) -> None:
+        # Each mark runs from the previous one to this one, without the time
+        # spent in phase() blocks in between.
+        self.__add(name, self.__pending + self.__split())
+        self.__pending = 0.0
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        # Phases nest: time spent in an inner phase is taken out of the outer
+        # one, so every second is counted once.
+        __elapsed = self.__split()
+        if len(self.__stack) > 0:
+            self.__add(self.__stack[-1], __elapsed)
+        else:
+            self.__pending += __elapsed
+        self.__stack.append(name)
+        try:
+            yield
+        finally:
+            self.__stack.pop()
+            self.__add(name, self.__split())
+
+    def result(self, config=None) -> dict:
+        from config.storage import counters
+        return {
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "total": round(time.perf_counter() - self.started, 6),
+            "io": dict(counters),
+            "config_parses": config.parses if config is not None else 0
+        }
+
+    def report(self, format: str, config=None) -> None:
+        result = self.result(config)
+        # stderr, so --format json/csv output on stdout stays clean.
+        if format == "json":
+            print(json.dumps(result), file=sys.stderr)
+            return
+        print(file=sys.stderr)
+        print("⏱️  Timings", file=sys.stderr)
+        for name, seconds in result["phases"].items():
+            print(f"   {name:<12} {seconds * 1000:9.1f} ms", file=sys.stderr)
+        print(f"   {'total':<12} {result['total'] * 1000:9.1f} ms", file=sys.stderr)
+        __io = result["io"]
+        print(f"   reads {__io['reads']} ({__io['read_bytes'] / 1024:.1f} KB), writes {__io['writes']} ({__io['written_bytes'] / 1024:.1f} KB), config parses {result['config_parses']}", file=sys.stderr)
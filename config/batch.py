@@ -0,0 +1,161 @@
+import difflib
+import json
+
+from .config import Items, Media, new_id
+
+ITEM_TYPES = ["website", "external", "pdf"]
+MEDIA_TYPES = ["image", "video"]
+LANGUAGES = ["de", "en", "all"]
+
+SCHEMA = {
+    "item": {
+        "add": {"required": ["title", "link", "type"], "optional": ["language", "position"]},
+        "edit": {"required": ["id", "language"], "optional": ["title", "link", "type"]},
+        "remove": {"required": ["id"], "optional": ["language"]},
+        "move": {"required": ["id", "to"], "optional": ["language"]}
+    },
+    "media": {
+        "add": {"required": ["title", "file", "type"], "optional": ["description"]},
+        "edit": {"required": ["id"], "optional": ["title", "file", "type", "description"]},
+        "remove": {"required": ["id"], "optional": []},
+        "move": {"required": ["id", "to"], "optional": []}
+    }
+}
+
+class BatchError(Exception):
+    def __init__(self, errors: list) -> None:
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+def parse(text: str, format: str = "auto") -> list:
+    if format == "auto":
+        format = "jsonl" if text.lstrip()[:1] in ["{", ""] else "yaml"
+    operations = []
+    if format == "jsonl":
+        for number, line in enumerate(text.splitlines(), 1):
+            if line.strip() == "" or line.lstrip().startswith("#"):
+                continue
+            try:
+                operations.append(json.loads(line))
+            except ValueError as e:
+                raise BatchError([f"line {number}: invalid JSON: {e}"])
+        return operations
+    try:
+        import yaml
+    except ImportError:
+        raise BatchError(["YAML input needs PyYAML (pip install pyyaml)."])
+    try:
+        for document in yaml.safe_load_all(text):
+            if document is None:
+                continue
+            operations.extend(document if isinstance(document, list) else [document])
+    except yaml.YAMLError as e:
+        raise BatchError([f"invalid YAML: {e}"])
+    return operations
+
+def validate(operations: list) -> None:
+    errors = []
+    for number, operation in enumerate(operations, 1):
+        if not isinstance(operation, dict):
+            errors.append(f"operation {number}: expected an object")
+            continue
+        __target = operation.get("target", "item")
+        __op = operation.get("op")
+        if __target not in SCHEMA:
+            errors.append(f"operation {number}: unknown target {__target!r}")
+            continue
+        if __op not in SCHEMA[__target]:
+            errors.append(f"operation {number}: unknown {__target} operation {__op!r}")
+            continue
+        __schema = SCHEMA[__target][__op]
+        for key in __schema["required"]:
+            if key not in operation:
+                errors.append(f"operation {number}: missing {key!r}")
+        for key in operation:
+            if key not in ["op", "target"] + __schema["required"] + __schema["optional"]:
+                errors.append(f"operation {number}: unexpected {key!r}")
+        if "id" in operation and not (isinstance(operation["id"], str) and operation["id"] != "" or isinstance(operation["id"], int) and operation["id"] > 0):
+            errors.append(f"operation {number}: 'id' must be an item id or a positive position")
+        if "to" in operation and (not isinstance(operation["to"], int) or operation["to"] < 1):
+            errors.append(f"operation {number}: 'to' must be a positive integer")
+        if "position" in operation and (not isinstance(operation["position"], int) or operation["position"] < 0):
+            errors.append(f"operation {number}: 'position' must be zero or a positive integer")
+        if "language" in operation and operation["language"] not in LANGUAGES:
+            errors.append(f"operation {number}: language must be one of {', '.join(LANGUAGES)}")
+        __types = ITEM_TYPES if __target == "item" else MEDIA_TYPES
+        if "type" in operation and operation["type"] not in __types:
+            errors.append(f"operation {number}: type must be one of {', '.join(__types)}")
+    if len(errors) > 0:
+        raise BatchError(errors)
+
+class Batch:
+    def __init__(self, items: Items, media: Media) -> None:
+        self.items = items
+        self.media = media
+
+    def __languages(self, operation: dict) -> list:
+        __language = operation.get("language", "all")
+        if __language == "all":
+            return ["de", "en"]
+        return [__language]
+
+    def __check(self, number: int, id: int, length: int) -> None:
+        if not 0 < id <= length:
+            raise BatchError([f"operation {number}: position {id} is out of range (1-{length})"])
+
+    def __resolve(self, number: int, position: int, id) -> int:
+        if position is None:
+            raise BatchError([f"operation {number}: unknown id {id}"])
+        return position
+
+    def __item(self, number: int, operation: dict) -> None:
+        __op = operation["op"]
+        __id = new_id()
+        for lang in self.__languages(operation):
+            __length = len(self.items.items.get(lang, []))
+            if __op == "add":
+                __position = operation.get("position", 0)
+                if __position > __length + 1:
+                    raise BatchError([f"operation {number}: position {__position} is out of range (1-{__length + 1})"])
+                self.items.add(lang, operation["title"], operation["link"], operation["type"], __position, __id)
+                continue
+            __position = self.__resolve(number, self.items.resolve(lang, operation["id"], output=False), operation["id"])
+            if __op == "edit":
+                self.items.edit(__position, lang, operation.get("title"), operation.get("link"), operation.get("type"), output=False)
+            elif __op == "remove":
+                self.items.remove(lang, __position)
+            elif __op == "move":
+                self.__check(number, operation["to"], __length)
+                self.items.move(lang, __position, operation["to"])
+
+    def __media(self, number: int, operation: dict) -> None:
+        __op = operation["op"]
+        __length = self.media.len
+        if __op == "add":
+            self.media.add(operation["title"], operation["file"], operation["type"], operation.get("description"))
+            return
+        __position = self.__resolve(number, self.media.resolve(operation["id"], output=False), operation["id"])
+        if __op == "edit":
+            self.media.edit(__position, operation.get("title"), operation.get("file"), operation.get("type"), operation.get("description"), output=False)
+        elif __op == "remove":
+            self.media.remove(__position)
+        elif __op == "move":
+            self.__check(number, operation["to"], __length)
+            self.media.move(__position, operation["to"])
+
+    def apply(self, operations: list) -> None:
+        validate(operations)
+        for number, operation in enumerate(operations, 1):
+            if operation.get("target", "item") == "item":
+                self.__item(number, operation)
+            else:
+                self.__media(number, operation)
+
+def diff(before: dict, after: dict, name: str) -> list:
+    return list(difflib.unified_diff(
+        json.dumps(before, indent=2, ensure_ascii=False).splitlines(),
+        json.dumps(after, indent=2, ensure_ascii=False).splitlines(),
+        fromfile=f"a/{name}",
+        tofile=f"b/{name}",
+        lineterm=""
+    ))
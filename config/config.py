@@ -1,9 +1,14 @@
 import configparser
-import json
+import hashlib
+import io
 import os
+import re
+import uuid
 
 from rich.console import Console
-from rich.table import Table
+
+from .journal import lines
+from .storage import read_json, write_json, write_text, lock
 
 console = Console()
 
@@ -12,20 +17,46 @@ class Configuration:
         self.path = path
         if not os.path.exists(self.path):
             exit(f"❌ Configuration file not found: {self.path}")
+        self.__config = None
+        self.__stamp = None
+        self.parses = 0
 
     def __read(self) -> configparser.ConfigParser:
-        config = configparser.ConfigParser()
-        config.read(self.path)
-        return config
-    
+        # Parsed once and reused until the file on disk changes.
+        __stat = os.stat(self.path)
+        __stamp = (__stat.st_mtime_ns, __stat.st_size)
+        if self.__config is None or self.__stamp != __stamp:
+            config = configparser.ConfigParser()
+            config.read(self.path)
+            self.__config = config
+            self.__stamp = __stamp
+            self.parses += 1
+        return self.__config
+
+    @staticmethod
+    def kiosk_section(name: str = None) -> str:
+        if name is None or name in ["kiosk", "default"]:
+            return "kiosk"
+        return f"kiosk:{name}"
+
+    @staticmethod
+    def kiosk_name(section: str) -> str:
+        if section == "kiosk":
+            return "default"
+        return section.split(":", 1)[1]
+
+    def kiosks(self) -> list:
+        __config = self.__read()
+        return [section for section in __config.sections() if section == "kiosk" or section.startswith("kiosk:")]
+
     def list_sections(self) -> list:
         __config = self.__read()
         return __config.sections()
-    
+
     def get_section(self, section: str) -> dict:
         __config = self.__read()
         return dict(__config[section])
-    
+
     def add_section(self, section: str) -> None:
         __config = self.__read()
         __config.add_section(section)
@@ -34,16 +65,44 @@ class Configuration:
     def present_section(self, section: str) -> bool:
         __config = self.__read()
         return __config.has_section(section)
-    
+
     def get(self, section: str, key: str) -> str:
         __config = self.__read()
         return __config[section][key]
-    
+
+    def get_str(self, section: str, key: str, fallback: str = None) -> str:
+        __config = self.__read()
+        return __config.get(section, key, fallback=fallback)
+
+    def get_int(self, section: str, key: str, fallback: int = None) -> int:
+        __config = self.__read()
+        return __config.getint(section, key, fallback=fallback)
+
+    def get_float(self, section: str, key: str, fallback: float = None) -> float:
+        __config = self.__read()
+        return __config.getfloat(section, key, fallback=fallback)
+
+    def get_bool(self, section: str, key: str, fallback: bool = None) -> bool:
+        __config = self.__read()
+        return __config.getboolean(section, key, fallback=fallback)
+
+    def get_list(self, section: str, key: str, fallback: list = None) -> list:
+        __value = self.get_str(section, key)
+        if __value is None:
+            return fallback
+        return [value.strip() for value in __value.split(",") if value.strip() != ""]
+
+    def get_path(self, section: str, key: str, fallback: str = None) -> str:
+        __value = self.get_str(section, key)
+        if __value is None:
+            return fallback
+        return os.path.expanduser(__value)
+
     def set(self, section: str, key: str, value: str) -> None:
         __config = self.__read()
         __config[section][key] = value
         self.__save()
-    
+
     def remove(self, section: str, key: str ) -> None:
         __config = self.__read()
         __config.remove_option(section, key)
@@ -52,7 +111,7 @@ class Configuration:
     def present(self, section: str, key: str) -> bool:
         __config = self.__read()
         return __config.has_option(section, key)
-    
+
     def present_keys(self, section: str, keys: list) -> bool:
         __config = self.__read()
         for key in keys:
@@ -61,76 +120,234 @@ class Configuration:
         return True
 
     def __save(self) -> None:
-        with open(self.path, "w") as file:
-            self.config.write(file)
-    
+        __buffer = io.StringIO()
+        self.__config.write(__buffer)
+        write_text(self.path, __buffer.getvalue())
+        __stat = os.stat(self.path)
+        self.__stamp = (__stat.st_mtime_ns, __stat.st_size)
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+def legacy_id(seed: str, taken: set) -> str:
+    # Entries written before ids existed get an id derived from their content
+    # and position, so it stays the same across runs until it is saved.
+    id = hashlib.sha1(seed.encode("utf-8")).hexdigest()[:8]
+    while id in taken:
+        id = hashlib.sha1(id.encode("utf-8")).hexdigest()[:8]
+    return id
+
 class Items:
-    def __init__(self, path: str) -> None:
+    EMPTY = {"de": [], "en": []}
+
+    def __init__(self, path: str, store=None, journal=None) -> None:
         self.path = path
-        self.items = self.__read()
-        self.de = self.items["de"]
-        self.en = self.items["en"]
-        self.de_len = len(self.de)
-        self.en_len = len(self.en)
-    
+        self.store = store
+        self.journal = journal
+        self.__before = None
+        self.__indexes = {}
+        # Read on first use: commands that open the file with `with` read it
+        # once, under the lock, and not once more beforehand.
+        self.__items = None
+        self.dirty = False
+
+    @property
+    def items(self) -> dict:
+        if self.__items is None:
+            self.__load()
+        return self.__items
+
+    @items.setter
+    def items(self, value: dict) -> None:
+        self.__items = value
+
+    def __load(self) -> None:
+        self.__items = self.__read()
+        self.dirty = self.__migrate()
+
+    @property
+    def dirty(self) -> bool:
+        return self.__dirty
+
+    @dirty.setter
+    def dirty(self, value: bool) -> None:
+        self.__dirty = value
+        if value:
+            self.__indexes = {}
+
+    def __migrate(self) -> bool:
+        __de = self.items.get("de", [])
+        __legacy = set(position for position, item in enumerate(__de) if "id" not in item)
+        changed = False
+        for language, items in self.items.items():
+            __taken = set(item["id"] for item in items if "id" in item)
+            for position, item in enumerate(items):
+                if "id" in item:
+                    continue
+                # Tiles at the same position were added as a de/en pair.
+                __anchor = __de[position] if position in __legacy else item
+                item["id"] = legacy_id(f"{position}:{__anchor.get('title')}:{__anchor.get('link')}", __taken)
+                __taken.add(item["id"])
+                changed = True
+        return changed
+
+    def __index(self, language: str, key: str) -> dict:
+        __name = f"{language}:{key}"
+        if __name not in self.__indexes:
+            index = {}
+            for position, item in enumerate(self.items.get(language, []), 1):
+                if key == "id":
+                    index[item["id"]] = position
+                else:
+                    index.setdefault(item.get(key), []).append(position)
+            self.__indexes[__name] = index
+        return self.__indexes[__name]
+
+    def resolve(self, language: str, ref, output: bool = True) -> int:
+        __ref = str(ref)
+        __index = self.__index(language, "id")
+        if __ref in __index:
+            return __index[__ref]
+        if __ref.isdigit() and 0 < int(__ref) <= len(self.items.get(language, [])):
+            return int(__ref)
+        if output:
+            console.print(f"❌ Invalid ID: {ref}.", style="red")
+        return None
+
+    def find(self, language: str, title: str = None, link: str = None) -> list:
+        __positions = None
+        if title is not None:
+            __positions = set(self.__index(language, "title").get(title, []))
+        if link is not None:
+            __matches = set(self.__index(language, "link").get(link, []))
+            __positions = __matches if __positions is None else __positions & __matches
+        return sorted(__positions or [])
+
+    def pair(self, id: str) -> dict:
+        pair = {}
+        for language in self.items:
+            __position = self.__index(language, "id").get(id)
+            if __position is not None:
+                pair[language] = self.items[language][__position - 1]
+        return pair
+
+    @property
+    def de(self) -> list:
+        return self.items["de"]
+
+    @property
+    def en(self) -> list:
+        return self.items["en"]
+
+    @property
+    def de_len(self) -> int:
+        return len(self.de)
+
+    @property
+    def en_len(self) -> int:
+        return len(self.en)
+
     def __read(self) -> dict:
-        with open(self.path, "r") as file:
-            return json.load(file)
-        
+        if self.store is not None:
+            return self.store.load("items", self.EMPTY)
+        return read_json(self.path)
+
     def generate(self) -> None:
-        with open(self.path, "w") as file:
-            json.dump({
-                "de": [],
-                "en": []
-            }, file)
-    
+        write_json(self.path, {
+            "de": [],
+            "en": []
+        })
+
+    def __enter__(self) -> "Items":
+        self.__lock = lock(self.path if self.store is None else self.store.lock_path("items"))
+        self.__lock.__enter__()
+        # Read under the lock so concurrent writers are not overwritten.
+        self.__load()
+        if self.journal is not None:
+            self.__before = lines(self.items)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.__lock.__exit__(*exc)
+
+    def flush(self, record: bool = True) -> None:
+        if not self.dirty:
+            return
+        if self.store is not None:
+            self.store.save("items", self.items)
+        else:
+            write_json(self.path, self.items)
+        self.dirty = False
+        if self.__before is not None:
+            __after = lines(self.items)
+            if record:
+                self.journal.record("items", self.__before, __after)
+            self.__before = __after
+
     def get(self, language: str) -> list:
-        __items = self.__read()
-        return __items[language]
-    
-    def add(self, language: str, title: str, link: str, type: str, position: int = 0) -> dict:
+        return self.items[language]
+
+    def add(self, language: str, title: str, link: str, type: str, position: int = 0, id: str = None) -> dict:
         item = {
+            "id": id or new_id(),
             "title": title,
             "link": link,
             "type": type
         }
-        __items = self.__read()
+        if language not in self.items:
+            self.items[language] = []
 
-        if language not in __items:
-            __items[language] = []
-    
         if position > 0:
-            __items[language].insert(position - 1, item)
+            self.items[language].insert(position - 1, item)
         else:
-            __items[language].append(item)
+            self.items[language].append(item)
+        self.dirty = True
 
-        with open(self.path, "w") as file:
-            json.dump(__items, file)
+        return dict(item, language=language)
 
-        item["language"] = language
-        return item
+    def remove(self, language: str, id: int) -> bool:
+        if 0 < id <= len(self.items[language]):
+            self.items[language].pop(id - 1)
+            self.dirty = True
+            return True
+        console.print(f"❌ Invalid ID: {id}.", style="red")
+        return False
 
-    def remove(self, language: str, id: int) -> None:
-        __items = self.__read()
-        if 0 < id <= len(__items[language]) + 1:
-            __items[language].pop(id - 1)
-            with open(self.path, "w") as file:
-                json.dump(__items, file)
-        else:
-            console.print(f"❌ Invalid ID: {id}.", style="red")
+    def move(self, language: str, id: int, to: int) -> bool:
+        __items = self.items[language]
+        if not (0 < id <= len(__items) and 0 < to <= len(__items)):
+            console.print(f"❌ Invalid ID: {id if not 0 < id <= len(__items) else to}.", style="red")
+            return False
+        __items.insert(to - 1, __items.pop(id - 1))
+        self.dirty = True
+        return True
+
+    def reorder(self, language: str, order: list) -> bool:
+        __items = self.items[language]
+        __seen = set()
+        for id in order:
+            if not 0 < id <= len(__items) or id in __seen:
+                console.print(f"❌ Invalid ID: {id}.", style="red")
+                return False
+            __seen.add(id)
+        # Listed ids come first in the given order, the rest keep their order.
+        __rest = [id for id in range(1, len(__items) + 1) if id not in __seen]
+        self.items[language] = [__items[id - 1] for id in list(order) + __rest]
+        self.dirty = True
+        return True
 
-    def edit(self, id: int, language: str, title: str = None, link: str = None, type: str = None) -> None:
-        __items = self.__read()
-        __new = __items[language][id - 1]
+    def edit(self, id: int, language: str, title: str = None, link: str = None, type: str = None, output: bool = True) -> None:
+        __new = self.items[language][id - 1]
         if title is not None:
             __new["title"] = title
         if link is not None:
             __new["link"] = link
         if type is not None:
             __new["type"] = type
-        __items[language][id - 1] = __new
-        with open(self.path, "w") as file:
-            json.dump(__items, file)
+        self.dirty = True
+        if not output:
+            return
+        from rich.table import Table
         table = Table()
         table.add_column("ID", justify="right", style="cyan")
         table.add_column("Title", style="magenta")
@@ -142,36 +359,168 @@ class Items:
         print()
 
     def clear(self) -> None:
-        __items = self.__read()
-        __items = {
+        self.items = {
             "de": [],
             "en": []
         }
-        with open(self.path, "w") as file:
-            json.dump(__items, file)
+        self.dirty = True
 
 class Media:
-    def __init__(self, path: str, media_path: str) -> None:
+    EMPTY = {"media": []}
+
+    def __init__(self, path: str, media_path: str, store=None, journal=None) -> None:
         self.path = path
         self.media_path = media_path
-        self.media = self.__read()
-        self.len = len(self.media)
+        self.store = store
+        self.journal = journal
+        self.__before = None
+        self.__indexes = {}
+        # Read on first use, like Items.
+        self.__media = None
+        self.dirty = False
+        self.__thumbnails = {}
+
+    @property
+    def media(self) -> dict:
+        if self.__media is None:
+            self.__load()
+        return self.__media
+
+    @media.setter
+    def media(self, value: dict) -> None:
+        self.__media = value
+
+    def __load(self) -> None:
+        self.__media = self.__read()
+        self.dirty = self.__migrate()
+
+    @property
+    def dirty(self) -> bool:
+        return self.__dirty
+
+    @dirty.setter
+    def dirty(self, value: bool) -> None:
+        self.__dirty = value
+        if value:
+            self.__indexes = {}
+
+    def __migrate(self) -> bool:
+        __taken = set(entry["id"] for entry in self.media["media"] if "id" in entry)
+        changed = False
+        for position, entry in enumerate(self.media["media"]):
+            if "id" not in entry:
+                entry["id"] = legacy_id(f"{position}:{entry.get('title')}:{entry.get('link')}", __taken)
+                __taken.add(entry["id"])
+                changed = True
+        return changed
+
+    def __index(self, key: str) -> dict:
+        if key not in self.__indexes:
+            index = {}
+            for position, entry in enumerate(self.media["media"], 1):
+                if key == "id":
+                    index[entry["id"]] = position
+                else:
+                    index.setdefault(entry.get(key), []).append(position)
+            self.__indexes[key] = index
+        return self.__indexes[key]
+
+    def resolve(self, ref, output: bool = True) -> int:
+        __ref = str(ref)
+        __index = self.__index("id")
+        if __ref in __index:
+            return __index[__ref]
+        if __ref.isdigit() and 0 < int(__ref) <= len(self.media["media"]):
+            return int(__ref)
+        if output:
+            console.print(f"❌ Invalid ID: {ref}.", style="red")
+        return None
+
+    def find(self, title: str = None, link: str = None) -> list:
+        __positions = None
+        if title is not None:
+            __positions = set(self.__index("title").get(title, []))
+        if link is not None:
+            __matches = set(self.__index("link").get(link, []))
+            __positions = __matches if __positions is None else __positions & __matches
+        return sorted(__positions or [])
+
+    @property
+    def len(self) -> int:
+        return len(self.media["media"])
 
     def __read(self) -> dict:
-        with open(self.path, "r") as file:
-            return json.load(file)
-    
+        if self.store is not None:
+            return self.store.load("media", self.EMPTY)
+        return read_json(self.path)
+
     def generate(self) -> None:
-        with open(self.path, "w") as file:
-            json.dump({
-                "media": []
-            }, file)
+        write_json(self.path, {
+            "media": []
+        })
+
+    def __enter__(self) -> "Media":
+        self.__lock = lock(self.path if self.store is None else self.store.lock_path("media"))
+        self.__lock.__enter__()
+        self.__load()
+        if self.journal is not None:
+            self.__before = lines(self.media)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.__lock.__exit__(*exc)
+
+    def flush(self, record: bool = True) -> None:
+        if not self.dirty:
+            return
+        if self.store is not None:
+            self.store.save("media", self.media)
+        else:
+            write_json(self.path, self.media)
+        self.dirty = False
+        if self.__before is not None:
+            __after = lines(self.media)
+            if record:
+                self.journal.record("media", self.__before, __after)
+            self.__before = __after
 
     def get(self) -> list:
-        __media = self.__read()
-        return __media["media"]
-    
-    def add(self, title: str, path: str, type: str, description: str = None) -> dict:
+        return self.media["media"]
+
+    def __generated(self, directory: str) -> dict:
+        # Thumbnail name -> names of its size variants, as the last thumbnail
+        # run recorded them. Files on disk are not matched: variants of sizes
+        # that were dropped from thumbnail_sizes must not come back.
+        __path = os.path.join(self.media_path, directory, ".manifest.json")
+        try:
+            __entries = read_json(__path).get("entries", {}) if os.path.exists(__path) else {}
+        except (OSError, ValueError):
+            __entries = {}
+        generated = {}
+        for entry in __entries.values():
+            __targets = [os.path.basename(target) for target in entry.get("targets", [])]
+            if len(__targets) > 0:
+                generated[__targets[0]] = __targets[1:]
+        return generated
+
+    def variants(self, thumbnail: str) -> list:
+        __directory, __name = os.path.split(thumbnail.lstrip("/"))
+        if __directory not in self.__thumbnails:
+            self.__thumbnails[__directory] = self.__generated(__directory)
+        __pattern = re.compile(re.escape(os.path.splitext(__name)[0]) + r"-(\d+)\.(jpg|webp)$")
+        variants = []
+        for file in self.__thumbnails[__directory].get(__name, []):
+            match = __pattern.match(file)
+            if match is not None:
+                variants.append({
+                    "width": int(match.group(1)),
+                    "link": f"/{__directory}/{file}"
+                })
+        # Smallest first, so the kiosk can take the first variant that fits.
+        variants.sort(key=lambda variant: (variant["width"], variant["link"].endswith(".jpg")))
+        return variants
+
+    def add(self, title: str, path: str, type: str, description: str = None, id: str = None) -> dict:
         __path = path
         if type == "video":
             __path = f"/videos/{path}"
@@ -181,36 +530,46 @@ class Media:
         if type == "video":
             thumbnail = f"/thumbnails/{path}".replace(".mp4", ".jpg")
         media = {
+            "id": id or new_id(),
             "title": title,
             "link": __path,
             "type": type,
             "thumbnail": thumbnail
         }
+        if type == "video":
+            __variants = self.variants(thumbnail)
+            if len(__variants) > 0:
+                media["thumbnails"] = __variants
         if description is not None:
             media["description"] = description
-        __media = self.__read()
-        __media["media"].append(media)
-        with open(self.path, "w") as file:
-            json.dump(__media, file)
+        self.media["media"].append(media)
+        self.dirty = True
         return media
-    
-    def remove(self, id: int) -> None:
-        __media = self.__read()
-        if 0 < id <= len(__media["media"]) + 1:
-            __media["media"].pop(id - 1)
-            with open(self.path, "w") as file:
-                json.dump(__media, file)
-        else:
-            console.print(f"❌ Invalid ID: {id}.", style="red")
 
-    def edit(self, id: int, title: str = None, path: str = None, type: str = None, description: str = None) -> None:
+    def remove(self, id: int) -> bool:
+        if 0 < id <= len(self.media["media"]):
+            self.media["media"].pop(id - 1)
+            self.dirty = True
+            return True
+        console.print(f"❌ Invalid ID: {id}.", style="red")
+        return False
+
+    def move(self, id: int, to: int) -> bool:
+        __media = self.media["media"]
+        if not (0 < id <= len(__media) and 0 < to <= len(__media)):
+            console.print(f"❌ Invalid ID: {id if not 0 < id <= len(__media) else to}.", style="red")
+            return False
+        __media.insert(to - 1, __media.pop(id - 1))
+        self.dirty = True
+        return True
+
+    def edit(self, id: int, title: str = None, path: str = None, type: str = None, description: str = None, output: bool = True) -> None:
         __path = path
         if type == "video":
             __path = f"/videos/{path}"
         else:
             __path = f"/{path}"
-        __media = self.__read()
-        __new = __media["media"][id - 1]
+        __new = self.media["media"][id - 1]
         if title is not None:
             __new["title"] = title
         if path is not None:
@@ -219,9 +578,10 @@ class Media:
             __new["type"] = type
         if description is not None:
             __new["description"] = description
-        __media["media"][id - 1] = __new
-        with open(self.path, "w") as file:
-            json.dump(__media, file)
+        self.dirty = True
+        if not output:
+            return
+        from rich.table import Table
         table = Table()
         table.add_column("ID", justify="right", style="cyan")
         table.add_column("Title", style="magenta")
@@ -233,14 +593,12 @@ class Media:
 
         console.print(table)
         print()
-    
+
     def clear(self) -> None:
-        __media = self.__read()
-        __media = {
+        self.media = {
             "media": []
         }
-        with open(self.path, "w") as file:
-            json.dump(__media, file)
+        self.dirty = True
 
 if __name__ == "__main__":
     config = Configuration("config/shifiq.conf")
@@ -0,0 +1,97 @@
+import difflib
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from .storage import lock, write_text
+
+def lines(data: dict) -> list:
+    # One line per entry, so a diff touches only the entries that changed.
+    return [f"{collection}\t{json.dumps(entry, ensure_ascii=False)}" for collection, entries in data.items() for entry in entries]
+
+def document(lines: list, empty: dict) -> dict:
+    data = {collection: [] for collection in empty}
+    for line in lines:
+        collection, entry = line.split("\t", 1)
+        data.setdefault(collection, []).append(json.loads(entry))
+    return data
+
+def digest(lines: list) -> str:
+    return hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()[:16]
+
+def delta(before: list, after: list) -> list:
+    # Only the changed ranges are kept: [i1, i2, j1, j2, old lines, new lines].
+    return [[i1, i2, j1, j2, before[i1:i2], after[j1:j2]] for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, before, after, autojunk=False).get_opcodes() if tag != "equal"]
+
+class Journal:
+    def __init__(self, path: str, retention: int = 100, label: str = None) -> None:
+        self.path = path
+        self.retention = retention
+        self.label = label
+        # Everything one command run records shares this id, so a command
+        # that writes both documents is undone as one step.
+        self.command = uuid.uuid4().hex[:8]
+
+    def entries(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, "r") as file:
+            for line in file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A torn last line from a crash is skipped.
+                    continue
+        return entries
+
+    def commands(self) -> list:
+        # Entries grouped by command run, oldest first; entries written before
+        # commands were recorded stand alone.
+        commands = {}
+        for entry in self.entries():
+            commands.setdefault(entry.get("command", f"#{entry['seq']}"), []).append(entry)
+        return sorted(commands.values(), key=lambda entries: entries[0]["seq"])
+
+    def __write(self, entries: list) -> None:
+        write_text(self.path, "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+
+    def record(self, name: str, before: list, after: list) -> dict:
+        if before == after:
+            return None
+        with lock(self.path):
+            entries = self.entries()
+            entry = {
+                "seq": entries[-1]["seq"] + 1 if len(entries) > 0 else 1,
+                "time": time.time(),
+                "document": name,
+                "label": self.label,
+                "command": self.command,
+                "before": digest(before),
+                "after": digest(after),
+                "changes": delta(before, after)
+            }
+            # Trimming rewrites the journal, so it only happens once a quarter
+            # of the retention has piled up; appends are a single write.
+            if len(entries) + 1 > self.retention + max(1, self.retention // 4):
+                self.__write((entries + [entry])[-self.retention:])
+            else:
+                with open(self.path, "a") as file:
+                    file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    file.flush()
+                    os.fsync(file.fileno())
+        return entry
+
+    def revert(self, entry: dict, current: list, force: bool = False) -> list:
+        if not force and digest(current) != entry["after"]:
+            return None
+        reverted = list(current)
+        for i1, i2, j1, j2, old, new in reversed(entry["changes"]):
+            reverted[j1:j2] = old
+        return reverted
+
+    def drop(self, seqs: set) -> None:
+        with lock(self.path):
+            self.__write([entry for entry in self.entries() if entry["seq"] not in seqs])
@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+
+from .storage import counters, phase, read_json, write_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    document TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS entries (
+    document TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (document, collection, id)
+);
+CREATE INDEX IF NOT EXISTS entries_position ON entries (document, collection, position);
+"""
+
+def increasing(keys: list) -> set:
+    # Indexes of the longest run of keys that is still in order (keys of new
+    # entries are None); those entries can keep their position.
+    __tails = []
+    __previous = {}
+    for index, key in enumerate(keys):
+        if key is None:
+            continue
+        low, high = 0, len(__tails)
+        while low < high:
+            middle = (low + high) // 2
+            if keys[__tails[middle]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        __previous[index] = __tails[low - 1] if low > 0 else None
+        if low == len(__tails):
+            __tails.append(index)
+        else:
+            __tails[low] = index
+    kept = set()
+    index = __tails[-1] if len(__tails) > 0 else None
+    while index is not None:
+        kept.add(index)
+        index = __previous[index]
+    return kept
+
+def positions(keys: list) -> list:
+    # Positions are sparse: an entry inserted or moved between two others
+    # gets a key between theirs, so no other row has to be renumbered.
+    __kept = increasing(keys)
+    result = [keys[index] if index in __kept else None for index in range(len(keys))]
+    index = 0
+    while index < len(result):
+        if result[index] is not None:
+            index += 1
+            continue
+        __end = index
+        while __end < len(result) and result[__end] is None:
+            __end += 1
+        __low = result[index - 1] if index > 0 else None
+        __high = result[__end] if __end < len(result) else None
+        __count = __end - index
+        for offset in range(__count):
+            if __low is None and __high is None:
+                result[index + offset] = offset
+            elif __low is None:
+                result[index + offset] = __high - __count + offset
+            elif __high is None:
+                result[index + offset] = __low + offset + 1
+            else:
+                result[index + offset] = __low + (__high - __low) * (offset + 1) / (__count + 1)
+        index = __end
+    # Halving the same gap over and over runs out of float precision at
+    # some point; then the collection is numbered again from scratch.
+    if any(result[index] >= result[index + 1] for index in range(len(result) - 1)):
+        return list(range(len(result)))
+    return result
+
+class SqliteStore:
+    def __init__(self, path: str, sources: dict = None) -> None:
+        self.path = path
+        self.sources = sources or {}
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        # Per document: collection -> id -> (position, serialized entry) as
+        # last loaded or saved, so save() only touches rows that changed.
+        self.__loaded = {}
+
+    def lock_path(self, document: str) -> str:
+        return f"{self.path}.{document}"
+
+    def __import(self, document: str) -> None:
+        if self.connection.execute("SELECT 1 FROM documents WHERE document = ?", (document,)).fetchone() is not None:
+            return
+        # The first use of the store picks up the existing JSON document.
+        __source = self.sources.get(document)
+        __data = read_json(__source) if __source is not None and os.path.exists(__source) else {}
+        with self.connection:
+            for collection, entries in __data.items():
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO entries (document, collection, id, position, data) VALUES (?, ?, ?, ?, ?)",
+                    [(document, collection, entry.get("id") or f"legacy-{position}", position, json.dumps(entry)) for position, entry in enumerate(entries)]
+                )
+            self.connection.execute("INSERT INTO documents (document) VALUES (?)", (document,))
+
+    def load(self, document: str, empty: dict) -> dict:
+        with phase("storage"):
+            return self.__load(document, empty)
+
+    def __load(self, document: str, empty: dict) -> dict:
+        self.__import(document)
+        data = {collection: [] for collection in empty}
+        __loaded = {collection: {} for collection in empty}
+        for collection, id, position, entry in self.connection.execute("SELECT collection, id, position, data FROM entries WHERE document = ? ORDER BY collection, position", (document,)):
+            data.setdefault(collection, []).append(json.loads(entry))
+            __loaded.setdefault(collection, {})[id] = (position, entry)
+            counters["read_bytes"] += len(entry)
+        # Counted like the JSON files, so --timings compares both backends.
+        counters["reads"] += 1
+        self.__loaded[document] = __loaded
+        return data
+
+    def save(self, document: str, data: dict) -> int:
+        with phase("storage"):
+            return self.__save(document, data)
+
+    def __save(self, document: str, data: dict) -> int:
+        __loaded = self.__loaded.get(document, {})
+        __upserts = []
+        __deletes = []
+        __saved = {}
+        for collection in set(__loaded) | set(data):
+            __before = __loaded.get(collection, {})
+            __after = {}
+            __entries = data.get(collection, [])
+            __positions = positions([__before[entry["id"]][0] if entry["id"] in __before else None for entry in __entries])
+            for position, entry in zip(__positions, __entries):
+                __entry = json.dumps(entry)
+                __after[entry["id"]] = (position, __entry)
+                if __before.get(entry["id"]) != (position, __entry):
+                    __upserts.append((document, collection, entry["id"], position, __entry))
+            for id in __before:
+                if id not in __after:
+                    __deletes.append((document, collection, id))
+            __saved[collection] = __after
+        with self.connection:
+            self.connection.executemany("DELETE FROM entries WHERE document = ? AND collection = ? AND id = ?", __deletes)
+            self.connection.executemany("INSERT OR REPLACE INTO entries (document, collection, id, position, data) VALUES (?, ?, ?, ?, ?)", __upserts)
+        if len(__upserts) + len(__deletes) > 0:
+            counters["writes"] += 1
+            counters["written_bytes"] += sum(len(row[4]) for row in __upserts)
+        self.__loaded[document] = __saved
+        return len(__upserts) + len(__deletes)
+
+    def export(self, document: str, empty: dict, path: str) -> None:
+        write_json(path, self.load(document, empty))
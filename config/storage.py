@@ -0,0 +1,107 @@
+import contextlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# File I/O through this module, reported by --timings.
+counters = {
+    "reads": 0,
+    "read_bytes": 0,
+    "writes": 0,
+    "written_bytes": 0
+}
+
+# The Timings of this run while --timings is on.
+timings = None
+
+@contextlib.contextmanager
+def phase(name: str):
+    # Commands fanned out over threads (--all-kiosks) are not split up; their
+    # time stays with the surrounding phase.
+    if timings is None or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    with timings.phase(name):
+        yield
+
+def read_json(path: str) -> dict:
+    with phase("storage"), open(path, "r") as file:
+        counters["reads"] += 1
+        counters["read_bytes"] += os.fstat(file.fileno()).st_size
+        return json.load(file)
+
+def write_json(path: str, data: dict) -> None:
+    write_text(path, json.dumps(data))
+
+def write_text(path: str, text: str) -> None:
+    with phase("storage"):
+        _write(path, text, "w")
+
+def write_bytes(path: str, data: bytes) -> None:
+    with phase("storage"):
+        _write(path, data, "wb")
+
+def _write(path: str, data, mode: str) -> None:
+    __directory = os.path.dirname(os.path.abspath(path))
+    try:
+        __mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        __umask = os.umask(0)
+        os.umask(__umask)
+        __mode = 0o666 & ~__umask
+    # Readers (the kiosk web app) only ever see the old or the new document:
+    # the data is written and synced to a temp file next to the target, then
+    # renamed over it in one step.
+    fd, __temp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=__directory)
+    try:
+        with os.fdopen(fd, mode) as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+            counters["writes"] += 1
+            counters["written_bytes"] += os.fstat(file.fileno()).st_size
+        os.chmod(__temp, __mode)
+        os.replace(__temp, path)
+    except BaseException:
+        if os.path.exists(__temp):
+            os.remove(__temp)
+        raise
+    _sync_directory(__directory)
+
+def _sync_directory(directory: str) -> None:
+    if fcntl is None:
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+@contextlib.contextmanager
+def lock(path: str):
+    with open(f"{path}.lock", "a+") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -1,3 +1,3 @@
 @echo off
-cls
+if /i not "%1"=="-q" if /i not "%1"=="--quiet" if /i not "%1"=="--no-banner" cls
 py shifiq.py %*
\ No newline at end of file
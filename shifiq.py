@@ -1,23 +1,64 @@
-from rich.console import Console
+import time
 
-from config import Configuration
-from cli import Arguments, CLI
+# Taken before anything else is imported, so --timings includes the imports.
+STARTED = time.perf_counter()
 
-console = Console()
+from cli.args import Arguments
 
-def welcome():
+def welcome(console):
     print()
     console.print("👋 Welcome to the ShiftIQ CLI!!", style="bold")
     print()
 
-welcome()
+def main():
+    # Arguments are parsed before anything heavy is imported, so --help and
+    # scripted calls only pay for the modules the chosen command needs.
+    arguments = Arguments()
+    args = arguments.parse()
+    timings = None
+    if args.timings is not None:
+        from cli.timings import Timings
+        timings = Timings(STARTED)
+        timings.mark("arguments")
 
-cli = CLI(config=Configuration("shifiq.tst.conf"))
+    from rich.console import Console
+    from config import Configuration
+    from cli import CLI
 
-args = Arguments(cli=cli)
-try:
-    args.run()
-except KeyboardInterrupt:
-    console.print("\n\n👋 Goodbye!", style="bold")
-    print()
-    exit(0)
\ No newline at end of file
+    console = Console()
+    if timings is not None:
+        from config import storage
+        storage.timings = timings
+        timings.mark("imports")
+    if not args.quiet:
+        welcome(console)
+
+    config = Configuration("shifiq.tst.conf")
+    sections = config.kiosks() if args.all_kiosks else [Configuration.kiosk_section(name) for name in args.kiosks or [None]]
+    for section in sections:
+        if not config.present_section(section):
+            console.print(f"❌ Kiosk not found: {Configuration.kiosk_name(section)}", style="red")
+            exit(1)
+    if len(sections) > 1:
+        from cli.fleet import Fleet
+        cli = Fleet(config, sections, quiet=args.quiet)
+    else:
+        cli = CLI(config=config, quiet=args.quiet, section=sections[0])
+    if timings is not None:
+        timings.mark("setup")
+
+    try:
+        arguments.run(cli, args)
+    except KeyboardInterrupt:
+        console.print("\n\n👋 Goodbye!", style="bold")
+        print()
+        exit(0)
+    finally:
+        if timings is not None:
+            timings.mark("command")
+            timings.report(args.timings, config)
+
+# The thumbnail worker pool re-imports this module on spawn platforms (Windows),
+# so nothing may run at import time.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools.links import Links
+
+class Handler(BaseHTTPRequestHandler):
+    hits = []
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def __answer(self, method: str) -> None:
+        Handler.hits.append((method, self.path))
+        if self.path == "/slow":
+            time.sleep(2)
+        if self.path == "/missing":
+            self.send_response(404)
+        elif self.path == "/no-head" and method == "HEAD":
+            self.send_response(405)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self) -> None:
+        self.__answer("HEAD")
+
+    def do_GET(self) -> None:
+        self.__answer("GET")
+
+@pytest.fixture
+def server():
+    Handler.hits = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+def links(directory, ttl: int = 3600, timeout: float = 5) -> Links:
+    return Links(str(directory), os.path.join(str(directory), ".links.json"), ttl=ttl, timeout=timeout)
+
+def test_ok(server, tmp_path):
+    result = links(tmp_path).check([f"{server}/ok"])[f"{server}/ok"]
+    assert result["ok"] and result["status"] == 200
+
+def test_not_found(server, tmp_path):
+    result = links(tmp_path).check([f"{server}/missing"])[f"{server}/missing"]
+    assert not result["ok"] and result["status"] == 404
+
+def test_head_not_allowed_falls_back_to_get(server, tmp_path):
+    result = links(tmp_path).check([f"{server}/no-head"])[f"{server}/no-head"]
+    assert result["ok"] and result["status"] == 200
+    assert Handler.hits == [("HEAD", "/no-head"), ("GET", "/no-head")]
+
+def test_timeout(server, tmp_path):
+    result = links(tmp_path, timeout=0.5).check([f"{server}/slow"])[f"{server}/slow"]
+    assert not result["ok"] and result["status"] is None and result["error"]
+
+def test_cache_hit_within_ttl(server, tmp_path):
+    checker = links(tmp_path)
+    checker.check([f"{server}/ok"])
+    checker.save()
+    checker = links(tmp_path)
+    result = checker.check([f"{server}/ok"])[f"{server}/ok"]
+    assert result["ok"] and result["cached"] and checker.cached == 1
+    assert len(Handler.hits) == 1
+
+def test_cache_expires_after_ttl(server, tmp_path):
+    checker = links(tmp_path, ttl=0)
+    checker.check([f"{server}/ok"])
+    result = checker.check([f"{server}/ok"])[f"{server}/ok"]
+    assert not result["cached"]
+    assert len(Handler.hits) == 2
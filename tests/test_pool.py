@@ -0,0 +1,37 @@
+import os
+import time
+
+from tools import pool
+
+def work(job: dict) -> dict:
+    if job.get("crash"):
+        os._exit(1)
+    if job.get("hang"):
+        time.sleep(60)
+    if job.get("fail"):
+        raise ValueError("bad input")
+    return dict(job, error=None)
+
+def errors(results: list) -> dict:
+    return {result["name"]: result["error"] for result in results}
+
+def test_crash_only_fails_its_own_job():
+    jobs = [{"name": f"video-{index}"} for index in range(12)] + [{"name": "corrupt", "crash": True}]
+    results = pool.run(work, jobs, workers=4)
+    assert len(results) == 13
+    assert errors(results) == dict({f"video-{index}": None for index in range(12)}, corrupt="worker crashed")
+
+def test_hung_job_times_out():
+    jobs = [{"name": f"video-{index}"} for index in range(6)] + [{"name": "hung", "hang": True}]
+    started = time.monotonic()
+    results = pool.run(work, jobs, workers=2, timeout=2)
+    assert time.monotonic() - started < 30
+    assert errors(results) == dict({f"video-{index}": None for index in range(6)}, hung="timed out after 2s")
+
+def test_exceptions_are_reported_per_job():
+    results = pool.run(work, [{"name": "ok"}, {"name": "broken", "fail": True}], workers=2)
+    assert errors(results) == {"ok": None, "broken": "bad input"}
+
+def test_sequential_run():
+    results = pool.run(work, [{"name": "ok"}, {"name": "broken", "fail": True}], workers=1)
+    assert errors(results) == {"ok": None, "broken": "bad input"}
@@ -0,0 +1,133 @@
+import hashlib
+import mmap
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .library import Library
+from .manifest import Manifest
+
+CHUNK_SIZE = 8 * 1024 * 1024
+SAMPLE_SIZE = 64 * 1024
+
+def digest(path: str, partial: bool = False) -> str:
+    __hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        __size = os.fstat(file.fileno()).st_size
+        if __size == 0:
+            return __hash.hexdigest()
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if partial:
+                # Head and tail are enough to tell most same-sized files apart.
+                __hash.update(view[:SAMPLE_SIZE])
+                __hash.update(view[-SAMPLE_SIZE:])
+                return __hash.hexdigest()
+            __memory = memoryview(view)
+            try:
+                for offset in range(0, __size, CHUNK_SIZE):
+                    __hash.update(__memory[offset:offset + CHUNK_SIZE])
+            finally:
+                __memory.release()
+    return __hash.hexdigest()
+
+class Dedup:
+    def __init__(self, media_directory: str, workers: int = None) -> None:
+        self.media_directory = media_directory
+        self.workers = workers or os.cpu_count() or 1
+        self.library = Library(media_directory)
+        self.hashed = 0
+
+    def __path(self, relative: str) -> str:
+        return os.path.join(self.media_directory, relative)
+
+    def __refine(self, groups: list, partial: bool) -> list:
+        __paths = [path for group in groups for path in group]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            __digests = dict(zip(__paths, pool.map(lambda path: digest(self.__path(path), partial), __paths)))
+        if not partial:
+            self.hashed += len(__paths)
+        refined = []
+        for group in groups:
+            __buckets = {}
+            for path in group:
+                __buckets.setdefault(__digests[path], []).append(path)
+            refined.extend(bucket for bucket in __buckets.values() if len(bucket) > 1)
+        return refined
+
+    def groups(self, referenced: set = None) -> list:
+        __files = self.library.scan()
+        self.library.save()
+        __sizes = {}
+        for folder in ["images", "videos"]:
+            for relative in __files[folder]:
+                __size = os.stat(self.__path(relative)).st_size
+                if __size == 0:
+                    continue
+                __sizes.setdefault((folder, __size), []).append(relative)
+        __candidates = [group for group in __sizes.values() if len(group) > 1]
+        __small = [group for group in __candidates if os.stat(self.__path(group[0])).st_size <= 2 * SAMPLE_SIZE]
+        __large = [group for group in __candidates if os.stat(self.__path(group[0])).st_size > 2 * SAMPLE_SIZE]
+        __groups = self.__refine(__small, False) + self.__refine(self.__refine(__large, True), False)
+        referenced = referenced or set()
+        # Keep the copy the media file already points at, then the oldest one.
+        for group in __groups:
+            group.sort(key=lambda path: (f"/{path}" not in referenced, os.stat(self.__path(path)).st_mtime_ns, len(path), path))
+        return __groups
+
+    def rewrite(self, media, groups: list) -> int:
+        __canonical = {}
+        for group in groups:
+            for path in group[1:]:
+                __canonical[f"/{path}"] = f"/{group[0]}"
+        count = 0
+        for entry in media.get():
+            if entry["link"] not in __canonical:
+                continue
+            entry["link"] = __canonical[entry["link"]]
+            if entry["type"] == "video":
+                entry["thumbnail"] = "/thumbnails/" + os.path.splitext(entry["link"][len("/videos/"):])[0] + ".jpg"
+                # The duplicate's size variants would outlive it.
+                __variants = media.variants(entry["thumbnail"])
+                if len(__variants) > 0:
+                    entry["thumbnails"] = __variants
+                else:
+                    entry.pop("thumbnails", None)
+            media.dirty = True
+            count += 1
+        return count
+
+    def __forget(self, manifests: dict, target: str, path: str) -> None:
+        # The thumbnail, its size variants and the previews of a deleted copy
+        # go with it, and so do their manifest entries.
+        for name in [".manifest.json", ".preview-manifest.json"]:
+            if name not in manifests:
+                manifests[name] = Manifest(self.__path(f"thumbnails/{name}"))
+            entry = manifests[name].remove(target)
+            for file in entry.get("targets", []) if entry is not None else []:
+                if os.path.exists(file):
+                    os.remove(file)
+        __thumbnail = self.__path("thumbnails/" + os.path.splitext(path[len("videos/"):])[0] + ".jpg")
+        if os.path.exists(__thumbnail):
+            os.remove(__thumbnail)
+
+    def resolve(self, groups: list, mode: str) -> int:
+        __manifests = {}
+        count = 0
+        for group in groups:
+            __source = self.__path(group[0])
+            for path in group[1:]:
+                __target = self.__path(path)
+                if mode == "link":
+                    if os.path.samefile(__source, __target):
+                        continue
+                    __temp = f"{__target}.dedup"
+                    os.link(__source, __temp)
+                    os.replace(__temp, __target)
+                elif mode == "delete":
+                    os.remove(__target)
+                    if path.startswith("videos/"):
+                        self.__forget(__manifests, __target, path)
+                count += 1
+        for manifest in __manifests.values():
+            manifest.save()
+        return count
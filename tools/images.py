@@ -0,0 +1,113 @@
+import os
+import shutil
+import cv2
+
+from rich.console import Console
+
+from . import pool
+from .manifest import Manifest
+
+console = Console()
+
+# GIFs may be animated and SVGs are vectors; both are left alone.
+EXTENSIONS = [".jpg", ".jpeg", ".png", ".webp"]
+
+def parameters(extension: str, settings: dict) -> list:
+    if extension in [".jpg", ".jpeg"]:
+        return [cv2.IMWRITE_JPEG_QUALITY, settings["quality"], cv2.IMWRITE_JPEG_OPTIMIZE, 1, cv2.IMWRITE_JPEG_PROGRESSIVE, 1 if settings["progressive"] else 0]
+    if extension == ".webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, settings["quality"]]
+    return [cv2.IMWRITE_PNG_COMPRESSION, 9]
+
+def optimize(image: dict, originals: str, settings: dict) -> dict:
+    result = dict(image, before=os.path.getsize(image["path"]), after=None, error=None)
+    __original = os.path.join(originals, image["name"]) if originals is not None else None
+    if __original is not None and not image.get("output", False) and os.path.exists(__original):
+        # The file is not what the last run wrote but a new upload, which is
+        # the master now; the old original would bring back the old picture.
+        os.remove(__original)
+    # Settings changes start again from the kept original, not from an
+    # already re-encoded copy.
+    __source = __original if __original is not None and os.path.exists(__original) else image["path"]
+    # imread applies the EXIF orientation, and imwrite writes no metadata,
+    # so rotation survives while EXIF, GPS and colour profiles are dropped.
+    __flags = cv2.IMREAD_UNCHANGED if image["path"].lower().endswith(".png") else cv2.IMREAD_COLOR
+    frame = cv2.imread(__source, __flags)
+    if frame is None:
+        result["error"] = "could not read image"
+        return result
+    __height, __width = frame.shape[:2]
+    __factor = min(1.0, settings["max_width"] / __width, settings["max_height"] / __height)
+    if __factor < 1.0:
+        frame = cv2.resize(frame, (max(1, round(__width * __factor)), max(1, round(__height * __factor))), interpolation=cv2.INTER_AREA)
+    __directory, __name = os.path.split(image["path"])
+    __extension = os.path.splitext(__name)[1].lower()
+    # Hidden and with the same extension, which picks the encoder.
+    __temp = os.path.join(__directory, f".{os.path.splitext(__name)[0]}.optimize{__extension}")
+    try:
+        if not cv2.imwrite(__temp, frame, parameters(__extension, settings)):
+            raise OSError(f"could not write {__temp}")
+        result["after"] = os.path.getsize(__temp)
+        if __factor == 1.0 and __source == image["path"] and result["after"] >= result["before"]:
+            # Already as small as it gets at this quality; keep the file.
+            result["after"] = result["before"]
+            return result
+        if __original is not None and not os.path.exists(__original):
+            os.makedirs(os.path.dirname(__original), exist_ok=True)
+            try:
+                os.link(image["path"], __original)
+            except OSError:
+                shutil.copy2(image["path"], __original)
+        shutil.copymode(image["path"], __temp)
+        os.replace(__temp, image["path"])
+    finally:
+        if os.path.exists(__temp):
+            os.remove(__temp)
+    return result
+
+class Images:
+    def __init__(self, image_path: str, originals: str = None, max_width: int = 1920, max_height: int = 1080, quality: int = 82, progressive: bool = True) -> None:
+        self.image_path = image_path
+        self.originals = originals
+        self.settings = {
+            "max_width": max_width,
+            "max_height": max_height,
+            "quality": quality,
+            "progressive": progressive
+        }
+        self.images = self.list()
+        self.manifest = Manifest(os.path.join(self.image_path, ".optimize-manifest.json"))
+        self.skipped = 0
+
+    def list(self) -> list:
+        images = []
+        for root, directories, files in os.walk(self.image_path):
+            directories[:] = sorted(directory for directory in directories if not directory.startswith("."))
+            for name in sorted(files):
+                if not name.startswith(".") and os.path.splitext(name)[1].lower() in EXTENSIONS:
+                    __path = os.path.join(root, name)
+                    images.append({"path": __path, "name": os.path.relpath(__path, self.image_path)})
+        return images
+
+    def __report(self, result: dict, done: int, total: int) -> None:
+        if result["error"] is not None:
+            console.print(f"❌ [{done}/{total}] Could not optimize {result['name']}: {result['error']}", style="red")
+            return
+        self.manifest.update(result["path"], [], self.settings)
+        if result["after"] < result["before"]:
+            console.print(f"✅ [{done}/{total}] {result['name']}: {result['before'] / 1024:.0f} KB → {result['after'] / 1024:.0f} KB", style="bold")
+        else:
+            console.print(f"⏭️ [{done}/{total}] {result['name']} is already optimized.")
+
+    def pending(self, force: bool = False) -> list:
+        return [dict(image, output=self.manifest.recorded(image["path"])) for image in self.images if force or self.manifest.changed(image["path"], self.settings)]
+
+    def generate(self, workers: int = 1, force: bool = False) -> list:
+        self.manifest.prune([image["path"] for image in self.images])
+        __images = self.pending(force)
+        self.skipped = len(self.images) - len(__images)
+        if self.skipped > 0:
+            console.print(f"⏭️ {self.skipped} unchanged images skipped.")
+        __results = pool.run(optimize, __images, (self.originals, self.settings), workers, self.__report)
+        self.manifest.save()
+        return __results
@@ -0,0 +1,137 @@
+import os
+
+from config.storage import read_json, write_json
+
+FOLDERS = ["images", "videos", "thumbnails"]
+IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"]
+VIDEO_EXTENSIONS = [".mp4"]
+
+class Library:
+    def __init__(self, media_directory: str, rescan: bool = False) -> None:
+        self.media_directory = media_directory
+        self.index_path = os.path.join(media_directory, ".shifiq-index.json")
+        self.index = {} if rescan else self.__read()
+        self.scanned = 0
+        self.dirty = False
+
+    def __read(self) -> dict:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            return read_json(self.index_path).get("directories", {})
+        except (OSError, ValueError):
+            return {}
+
+    def __walk(self, relative: str, seen: dict) -> list:
+        __path = os.path.join(self.media_directory, relative)
+        try:
+            __mtime = os.stat(__path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        entry = self.index.get(relative)
+        # A directory's mtime only changes when entries are added, removed or
+        # renamed in it, so unchanged directories reuse their cached listing.
+        if entry is None or entry["mtime"] != __mtime:
+            entry = {"mtime": __mtime, "files": [], "directories": []}
+            with os.scandir(__path) as iterator:
+                for item in iterator:
+                    if item.name.startswith("."):
+                        continue
+                    if item.is_dir(follow_symlinks=False):
+                        entry["directories"].append(item.name)
+                    elif item.is_file():
+                        entry["files"].append(item.name)
+            entry["files"].sort()
+            entry["directories"].sort()
+            self.index[relative] = entry
+            self.scanned += 1
+            self.dirty = True
+        seen[relative] = True
+        files = [f"{relative}/{name}" for name in entry["files"]]
+        for directory in entry["directories"]:
+            files.extend(self.__walk(f"{relative}/{directory}", seen))
+        return files
+
+    def scan(self) -> dict:
+        seen = {}
+        files = {folder: self.__walk(folder, seen) for folder in FOLDERS}
+        for relative in list(self.index):
+            if relative not in seen:
+                del self.index[relative]
+                self.dirty = True
+        return files
+
+    def __identity(self, link: str):
+        try:
+            __stat = os.stat(os.path.join(self.media_directory, link.lstrip("/")))
+            return (__stat.st_dev, __stat.st_ino)
+        except OSError:
+            return None
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        write_json(self.index_path, {"directories": self.index})
+        self.dirty = False
+
+    def sync(self, media, prune: bool = False) -> dict:
+        files = self.scan()
+        report = {
+            "added": [],
+            "missing": [],
+            "linked": [],
+            "unlinked": []
+        }
+        __present = set(f"/{file}" for folder in ["images", "videos"] for file in files[folder])
+        __thumbnails = set(f"/{file}" for file in files["thumbnails"])
+        __known = set(entry["link"] for entry in media.get())
+        # Hard links left by `media dedup --link` are one file under several
+        # names; only the name the media file already uses counts. Known
+        # files are only stat'ed once a new file turns up.
+        __identities = None
+
+        for file in files["images"] + files["videos"]:
+            __folder, __name = file.split("/", 1)
+            __extension = os.path.splitext(__name)[1].lower()
+            if __folder == "images" and __extension not in IMAGE_EXTENSIONS:
+                continue
+            if __folder == "videos" and __extension not in VIDEO_EXTENSIONS:
+                continue
+            if f"/{file}" in __known:
+                continue
+            if __identities is None:
+                __identities = set(self.__identity(link) for link in __known if link in __present)
+            __identity = self.__identity(f"/{file}")
+            if __identity is not None and __identity in __identities:
+                continue
+            __identities.add(__identity)
+            __title = os.path.splitext(os.path.basename(__name))[0]
+            media.add(__title, __name, "video" if __folder == "videos" else "image")
+            report["added"].append(f"/{file}")
+
+        for id in range(len(media.get()), 0, -1):
+            entry = media.get()[id - 1]
+            if not entry["link"].startswith(("/images/", "/videos/")):
+                continue
+            if entry["link"] not in __present:
+                report["missing"].append(entry["link"])
+                if prune:
+                    media.remove(id)
+                continue
+            if entry["type"] != "video":
+                continue
+            __thumbnail = "/thumbnails/" + os.path.splitext(entry["link"][len("/videos/"):])[0] + ".jpg"
+            if __thumbnail not in __thumbnails:
+                report["unlinked"].append(entry["link"])
+                continue
+            __variants = media.variants(__thumbnail)
+            if entry.get("thumbnail") != __thumbnail or entry.get("thumbnails", []) != __variants:
+                entry["thumbnail"] = __thumbnail
+                if len(__variants) > 0:
+                    entry["thumbnails"] = __variants
+                else:
+                    entry.pop("thumbnails", None)
+                media.dirty = True
+                report["linked"].append(entry["link"])
+        report["missing"].reverse()
+        return report
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+import urllib.error
+import urllib.request
+
+from concurrent.futures import ThreadPoolExecutor
+
+from config.storage import read_json, write_json
+
+USER_AGENT = "shifiq-link-check"
+
+def head(url: str, timeout: float) -> dict:
+    result = {"ok": False, "status": None, "error": None}
+    for method in ["HEAD", "GET"]:
+        request = urllib.request.Request(url, method=method, headers={"User-Agent": USER_AGENT})
+        if method == "GET":
+            # Only the first byte is needed from servers that refuse HEAD.
+            request.add_header("Range", "bytes=0-0")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                result.update(ok=True, status=response.status, error=None)
+                return result
+        except urllib.error.HTTPError as e:
+            result.update(status=e.code, error=e.reason)
+            if e.code not in [403, 405, 501]:
+                return result
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            result["error"] = str(getattr(e, "reason", e))
+            return result
+    return result
+
+def stat(path: str) -> dict:
+    try:
+        if os.stat(path).st_size == 0:
+            return {"ok": False, "status": None, "error": "empty file"}
+        return {"ok": True, "status": None, "error": None}
+    except FileNotFoundError:
+        return {"ok": False, "status": None, "error": "file not found"}
+    except OSError as e:
+        return {"ok": False, "status": None, "error": e.strerror}
+
+class Links:
+    def __init__(self, media_directory: str, cache_path: str, ttl: int = 3600, concurrency: int = 16, timeout: float = 10) -> None:
+        self.media_directory = media_directory
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.cache = self.__read()
+        self.cached = 0
+
+    def __read(self) -> dict:
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            return read_json(self.cache_path).get("links", {})
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        __now = time.time()
+        write_json(self.cache_path, {"links": {link: entry for link, entry in self.cache.items() if __now - entry["checked"] < self.ttl}})
+
+    def local(self, link: str) -> str:
+        if link.startswith("file://"):
+            return link[len("file://"):]
+        return os.path.join(self.media_directory, link.lstrip("/"))
+
+    async def __probe(self, link: str, semaphore: asyncio.Semaphore, refresh: bool) -> dict:
+        if not link.startswith(("http://", "https://")):
+            # Local files are stat-checked on every run; that is cheaper than
+            # trusting a stale cache entry.
+            return dict(stat(self.local(link)), link=link, cached=False)
+        entry = self.cache.get(link)
+        if not refresh and entry is not None and time.time() - entry["checked"] < self.ttl:
+            self.cached += 1
+            return dict(entry, link=link, cached=True)
+        async with semaphore:
+            result = await asyncio.to_thread(head, link, self.timeout)
+        # Only answers from the server are cached; timeouts and DNS errors
+        # are retried on the next run.
+        if result["status"] is not None:
+            self.cache[link] = dict(result, checked=time.time())
+        return dict(result, link=link, cached=False)
+
+    async def __check(self, links: list, refresh: bool) -> dict:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # to_thread() runs on the default executor, which would otherwise cap
+        # the concurrency at its own size.
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=self.concurrency))
+        __results = await asyncio.gather(*[self.__probe(link, semaphore, refresh) for link in links])
+        return {result["link"]: result for result in __results}
+
+    def check(self, links: list, refresh: bool = False) -> dict:
+        # Every distinct link is probed once, however many tiles use it.
+        return asyncio.run(self.__check(sorted(set(links)), refresh))
@@ -0,0 +1,110 @@
+import hashlib
+import os
+
+from config.storage import read_json, write_json
+
+class Manifest:
+    def __init__(self, path: str, hash: bool = False) -> None:
+        self.path = path
+        self.hash = hash
+        self.entries = self.__read()
+        self.dirty = False
+
+    def __read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            return read_json(self.path).get("entries", {})
+        except (OSError, ValueError):
+            # A damaged manifest only costs one full run, never a failed one.
+            return {}
+
+    def __key(self, source: str) -> str:
+        return os.path.abspath(source)
+
+    def __stat(self, source: str) -> dict:
+        __stat = os.stat(source)
+        return {
+            "size": __stat.st_size,
+            "mtime": __stat.st_mtime_ns
+        }
+
+    def digest(self, source: str) -> str:
+        __hash = hashlib.sha256()
+        with open(source, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                __hash.update(chunk)
+        return __hash.hexdigest()
+
+    def recorded(self, source: str) -> bool:
+        # The file is still exactly what the last run left behind.
+        entry = self.entries.get(self.__key(source))
+        if entry is None:
+            return False
+        __stat = self.__stat(source)
+        if entry["size"] == __stat["size"] and entry["mtime"] == __stat["mtime"]:
+            return True
+        # Same size but a new mtime (copied or touched file): with hashing
+        # enabled the content decides, and the entry is refreshed in place.
+        if self.hash and entry["size"] == __stat["size"] and entry.get("sha256") == self.digest(source):
+            entry["mtime"] = __stat["mtime"]
+            self.dirty = True
+            return True
+        return False
+
+    def changed(self, source: str, settings: dict = None) -> bool:
+        entry = self.entries.get(self.__key(source))
+        if entry is None:
+            return True
+        if entry.get("settings") != settings:
+            return True
+        for target in entry.get("targets", []):
+            if not os.path.exists(target):
+                return True
+        return not self.recorded(source)
+
+    def update(self, source: str, targets: list, settings: dict = None) -> None:
+        entry = self.__stat(source)
+        entry["targets"] = targets
+        entry["settings"] = settings
+        if self.hash:
+            entry["sha256"] = self.digest(source)
+        self.entries[self.__key(source)] = entry
+        self.dirty = True
+
+    def prune(self, sources: list) -> list:
+        __keep = {self.__key(source) for source in sources}
+        removed = []
+        for key in list(self.entries):
+            if key not in __keep:
+                removed.append(self.entries.pop(key))
+                self.dirty = True
+        return removed
+
+    def missing(self) -> list:
+        # Entries whose source file is gone. Unlike prune() this does not
+        # depend on a listing, so a wrong directory cannot empty the manifest.
+        removed = []
+        for key in list(self.entries):
+            if not os.path.exists(key):
+                removed.append(self.entries.pop(key))
+                self.dirty = True
+        return removed
+
+    def sha256(self, source: str) -> str:
+        # Needs hash=True; the digest is only recomputed when the file changed.
+        if self.changed(source):
+            self.update(source, [])
+        return self.entries[self.__key(source)]["sha256"]
+
+    def remove(self, source: str) -> dict:
+        entry = self.entries.pop(self.__key(source), None)
+        if entry is not None:
+            self.dirty = True
+        return entry
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        write_json(self.path, {"entries": self.entries})
+        self.dirty = False
@@ -0,0 +1,88 @@
+import os
+import shutil
+import struct
+
+# Boxes whose children can hold chunk offset tables.
+CONTAINERS = [b"moov", b"trak", b"mdia", b"minf", b"stbl"]
+
+def boxes(file, start: int, end: int) -> list:
+    found = []
+    __offset = start
+    while __offset + 8 <= end:
+        file.seek(__offset)
+        __size, __type = struct.unpack(">I4s", file.read(8))
+        __header = 8
+        if __size == 1:
+            __size = struct.unpack(">Q", file.read(8))[0]
+            __header = 16
+        elif __size == 0:
+            __size = end - __offset
+        if __size < __header:
+            raise ValueError(f"invalid {__type!r} box at {__offset}")
+        found.append((__type, __offset, __size, __header))
+        __offset += __size
+    return found
+
+def faststart(path: str) -> bool:
+    with open(path, "rb") as file:
+        __types = [box[0] for box in boxes(file, 0, os.fstat(file.fileno()).st_size)]
+    if b"moov" not in __types:
+        return False
+    return b"mdat" not in __types or __types.index(b"moov") < __types.index(b"mdat")
+
+def __patch(moov: bytearray, start: int, end: int, shift: int) -> None:
+    __offset = start
+    while __offset + 8 <= end:
+        __size, __type = struct.unpack_from(">I4s", moov, __offset)
+        __header = 8
+        if __size == 1:
+            __size = struct.unpack_from(">Q", moov, __offset + 8)[0]
+            __header = 16
+        if __size < __header:
+            raise ValueError(f"invalid {__type!r} box in moov")
+        if __type in CONTAINERS:
+            __patch(moov, __offset + __header, __offset + __size, shift)
+        elif __type in [b"stco", b"co64"]:
+            __count = struct.unpack_from(">I", moov, __offset + __header + 4)[0]
+            __format, __width = (">I", 4) if __type == b"stco" else (">Q", 8)
+            __entry = __offset + __header + 8
+            for _ in range(__count):
+                __value = struct.unpack_from(__format, moov, __entry)[0] + shift
+                if __type == b"stco" and __value > 0xFFFFFFFF:
+                    raise ValueError("chunk offsets do not fit into stco")
+                struct.pack_into(__format, moov, __entry, __value)
+                __entry += __width
+        __offset += __size
+
+def relocate(path: str, target: str) -> bool:
+    # Moves the moov box in front of the media data so players can start
+    # before the whole file is downloaded. The chunk offsets inside moov
+    # point into mdat, which moves back by the size of moov.
+    with open(path, "rb") as source:
+        __boxes = boxes(source, 0, os.fstat(source.fileno()).st_size)
+        __types = [box[0] for box in __boxes]
+        if b"moov" not in __types or b"mdat" not in __types:
+            return False
+        __moov = __boxes[__types.index(b"moov")]
+        __first = __types.index(b"mdat")
+        if __types.index(b"moov") < __first:
+            return False
+        source.seek(__moov[1])
+        moov = bytearray(source.read(__moov[2]))
+        __patch(moov, __moov[3], len(moov), len(moov))
+        with open(target, "wb") as output:
+            for index, (type, offset, size, _) in enumerate(__boxes):
+                if index == __first:
+                    output.write(moov)
+                if type == b"moov":
+                    continue
+                source.seek(offset)
+                __remaining = size
+                while __remaining > 0:
+                    __chunk = source.read(min(__remaining, 8 * 1024 * 1024))
+                    if not __chunk:
+                        break
+                    output.write(__chunk)
+                    __remaining -= len(__chunk)
+    shutil.copymode(path, target)
+    return True
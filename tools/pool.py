@@ -0,0 +1,99 @@
+import time
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+def failure(job: dict, error: str) -> dict:
+    return dict(job, error=error)
+
+def _kill(pool: ProcessPoolExecutor) -> None:
+    # A hung worker never returns, and shutdown() would wait for it forever.
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=True, cancel_futures=True)
+
+def _round(function, jobs: list, args: tuple, workers: int, timeout: float, collect, isolated: bool) -> list:
+    __pending = list(jobs)
+    suspects = []
+    pool = None
+    # future -> (job, submitted); at most `workers` are in flight, so the
+    # submit time is when the job started and can be held to the timeout.
+    __running = {}
+    try:
+        while __pending or __running:
+            if pool is None:
+                pool = ProcessPoolExecutor(max_workers=min(workers, len(__pending) + len(__running)))
+            while __pending and len(__running) < workers:
+                __job = __pending.pop(0)
+                __running[pool.submit(function, __job, *args)] = (__job, time.monotonic())
+            __wait = None
+            if timeout is not None:
+                __wait = max(0.0, min(started for _, started in __running.values()) + timeout - time.monotonic())
+            __done, _ = wait(list(__running), timeout=__wait, return_when=FIRST_COMPLETED)
+            __crashed = False
+            for future in __done:
+                __job, _ = __running.pop(future)
+                try:
+                    collect(future.result())
+                except BrokenProcessPool:
+                    __crashed = True
+                    if isolated:
+                        collect(failure(__job, "worker crashed"))
+                    else:
+                        suspects.append(__job)
+                except Exception as e:
+                    collect(failure(__job, str(e)))
+            __expired = []
+            if timeout is not None:
+                __now = time.monotonic()
+                __expired = [future for future, (_, started) in __running.items() if __now - started >= timeout]
+                for future in __expired:
+                    collect(failure(__running.pop(future)[0], f"timed out after {timeout:g}s"))
+            if not __crashed and not __expired:
+                continue
+            # The pool is unusable (crashed) or has to go (hung worker). Jobs
+            # still in flight were innocent if it was only a timeout; after a
+            # crash nobody knows which job did it, so they become suspects.
+            for future, (__job, _) in __running.items():
+                if __crashed and not isolated:
+                    suspects.append(__job)
+                elif __crashed:
+                    collect(failure(__job, "worker crashed"))
+                else:
+                    __pending.insert(0, __job)
+            __running = {}
+            _kill(pool)
+            pool = None
+    finally:
+        if pool is not None and __running:
+            _kill(pool)
+        elif pool is not None:
+            pool.shutdown(wait=True)
+    return suspects
+
+def run(function, jobs: list, args: tuple = (), workers: int = 1, report=None, timeout: float = None) -> list:
+    results = []
+    __total = len(jobs)
+
+    def collect(result: dict) -> None:
+        results.append(result)
+        if report is not None:
+            report(result, len(results), __total)
+
+    # In-process runs are cheapest but cannot be interrupted, so a timeout
+    # always needs worker processes.
+    if __total == 0 or (timeout is None and (workers <= 1 or __total <= 1)):
+        for job in jobs:
+            try:
+                collect(function(job, *args))
+            except Exception as e:
+                collect(failure(job, str(e)))
+        return results
+
+    # A worker that dies inside a native decoder breaks the whole pool. The
+    # jobs that were in flight get one more try, each alone in a fresh pool,
+    # so a file that crashes again only fails itself.
+    __suspects = _round(function, jobs, args, max(1, workers), timeout, collect, False)
+    for job in __suspects:
+        _round(function, [job], args, 1, timeout, collect, True)
+    return results
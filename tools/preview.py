@@ -0,0 +1,123 @@
+import os
+import cv2
+import numpy as np
+
+from rich.console import Console
+
+from . import pool
+from .manifest import Manifest
+
+console = Console()
+
+def frame_count(path: str) -> int:
+    cap = cv2.VideoCapture(path)
+    try:
+        count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if count > 0:
+            return count
+        # Some containers do not report a frame count; grab() skips the
+        # colour conversion, so counting is much cheaper than decoding.
+        count = 0
+        while cap.grab():
+            count += 1
+        return count
+    finally:
+        cap.release()
+
+def sample(path: str, frames: int, columns: int, width: int):
+    __count = frame_count(path)
+    if __count == 0:
+        return None, 0
+    __wanted = np.unique(np.linspace(0, __count - 1, min(frames, __count)).astype(int))
+    __rows = -(-len(__wanted) // columns)
+    tiles = None
+    cap = cv2.VideoCapture(path)
+    try:
+        index = 0
+        slot = 0
+        # One sequential pass: frames between samples are only grabbed, never
+        # retrieved, and there are no seeks back to keyframes.
+        while slot < len(__wanted) and cap.grab():
+            if index == __wanted[slot]:
+                ret, frame = cap.retrieve()
+                if ret:
+                    if tiles is None:
+                        __height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+                        tiles = np.zeros((__rows, columns, __height, width, 3), dtype=np.uint8)
+                    # Each tile is a contiguous view, so resize writes into place.
+                    cv2.resize(frame, (width, tiles.shape[2]), dst=tiles[slot // columns, slot % columns], interpolation=cv2.INTER_AREA)
+                slot += 1
+            index += 1
+    finally:
+        cap.release()
+    return tiles, slot
+
+def render(video: dict, media_path: str, settings: dict) -> dict:
+    __stem = os.path.join(media_path, os.path.splitext(video["name"])[0])
+    result = dict(video, targets=[], error=None)
+    tiles, count = sample(video["path"], settings["frames"], settings["columns"], settings["width"])
+    if tiles is None:
+        result["error"] = "could not read frames"
+        return result
+    __rows, __columns, __height, __width = tiles.shape[:4]
+    if settings["sheet"]:
+        __target = f"{__stem}-sheet.jpg"
+        __sheet = tiles.transpose(0, 2, 1, 3, 4).reshape(__rows * __height, __columns * __width, 3)
+        if not cv2.imwrite(__target, __sheet, [cv2.IMWRITE_JPEG_QUALITY, settings["quality"], cv2.IMWRITE_JPEG_OPTIMIZE, 1]):
+            raise OSError(f"could not write {__target}")
+        result["targets"].append(__target)
+    if settings["loop"]:
+        __target = f"{__stem}-preview.mp4"
+        writer = cv2.VideoWriter(__target, cv2.VideoWriter_fourcc(*"mp4v"), settings["fps"], (__width, __height))
+        if not writer.isOpened():
+            raise OSError(f"could not write {__target}")
+        try:
+            for tile in tiles.reshape(__rows * __columns, __height, __width, 3)[:count]:
+                writer.write(tile)
+        finally:
+            writer.release()
+        result["targets"].append(__target)
+    return result
+
+class Preview:
+    def __init__(self, video_path: str, media_path: str, frames: int = 12, columns: int = 4, width: int = 320, sheet: bool = True, loop: bool = False, fps: int = 2, quality: int = 80) -> None:
+        self.video_path = video_path
+        self.media_path = media_path
+        self.settings = {
+            "frames": frames,
+            "columns": columns,
+            "width": width,
+            "sheet": sheet,
+            "loop": loop,
+            "fps": fps,
+            "quality": quality
+        }
+        if not os.path.exists(self.media_path):
+            os.makedirs(self.media_path)
+        self.videos = [{"path": f"{self.video_path}/{name}", "name": name} for name in sorted(os.listdir(self.video_path)) if name.endswith(".mp4")] if os.path.exists(self.video_path) else []
+        self.manifest = Manifest(os.path.join(self.media_path, ".preview-manifest.json"))
+        self.skipped = 0
+
+    def __report(self, result: dict, done: int, total: int) -> None:
+        if result["error"] is None:
+            console.print(f"✅ [{done}/{total}] Preview generated for {result['name']}.", style="bold")
+        else:
+            console.print(f"❌ [{done}/{total}] Could not generate preview for {result['name']}: {result['error']}", style="red")
+
+    def generate(self, workers: int = 1, force: bool = False) -> list:
+        # Only previews of videos that are gone are removed, and nothing at
+        # all when the video directory is missing or empty.
+        for entry in self.manifest.missing() if len(self.videos) > 0 else []:
+            for target in entry.get("targets", []):
+                if os.path.exists(target):
+                    os.remove(target)
+        __videos = [v for v in self.videos if force or self.manifest.changed(v["path"], self.settings)]
+        self.skipped = len(self.videos) - len(__videos)
+        if self.skipped > 0:
+            console.print(f"⏭️ {self.skipped} unchanged videos skipped.")
+        __results = pool.run(render, __videos, (self.media_path, self.settings), workers, self.__report)
+        for result in __results:
+            if result["error"] is None:
+                self.manifest.update(result["path"], result["targets"], self.settings)
+        self.manifest.save()
+        return __results
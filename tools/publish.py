@@ -0,0 +1,174 @@
+import copy
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from config.storage import read_json, write_bytes, write_text
+from .manifest import Manifest
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Asset types worth precompressing; images and videos are compressed already.
+COMPRESSIBLE = [".json", ".svg", ".txt", ".css", ".js", ".html"]
+
+def minify(data: dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def etag(digest: str) -> str:
+    return f'"{digest[:16]}"'
+
+def foreign(target: str) -> bool:
+    # A directory with files but no manifest belongs to something else; a
+    # half-finished first publish only leaves assets/ and dot files.
+    if not os.path.isdir(target) or os.path.exists(os.path.join(target, "manifest.json")):
+        return False
+    return any(not name.startswith(".") and name != "assets" for name in os.listdir(target))
+
+class Publish:
+    def __init__(self, target: str, media_directory: str, base_url: str = "/") -> None:
+        self.target = target
+        self.media_directory = media_directory
+        self.base_url = base_url if base_url.endswith("/") else f"{base_url}/"
+        self.assets_path = os.path.join(self.target, "assets")
+        self.manifest_path = os.path.join(self.target, "manifest.json")
+        os.makedirs(self.assets_path, exist_ok=True)
+        # Digests of large videos are only computed again when they change.
+        self.digests = Manifest(os.path.join(self.target, ".digests.json"), hash=True)
+        self.files = {}
+        self.assets = {}
+        self.written = 0
+
+    def __compressed(self, path: str, content: bytes) -> dict:
+        variants = {}
+        __gzip = f"{path}.gz"
+        # Written atomically, so a file that exists is complete and can be
+        # skipped on the next run.
+        if not os.path.exists(__gzip):
+            # mtime=0 keeps the archive byte-identical between runs.
+            write_bytes(__gzip, gzip.compress(content, compresslevel=9, mtime=0))
+        variants["gzip"] = {"path": os.path.relpath(__gzip, self.target), "size": os.path.getsize(__gzip)}
+        if brotli is not None:
+            __brotli = f"{path}.br"
+            if not os.path.exists(__brotli):
+                write_bytes(__brotli, brotli.compress(content, quality=11))
+            variants["br"] = {"path": os.path.relpath(__brotli, self.target), "size": os.path.getsize(__brotli)}
+        return variants
+
+    def __copy(self, source: str, path: str) -> None:
+        # A copy, not a hard link: media files are edited in place, and a
+        # linked asset would change under its content-addressed name. The
+        # rename makes a half-copied asset impossible.
+        fd, __temp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            shutil.copy2(source, __temp)
+            os.replace(__temp, path)
+        except BaseException:
+            if os.path.exists(__temp):
+                os.remove(__temp)
+            raise
+
+    def asset(self, link: str) -> str:
+        if link in self.assets:
+            return self.assets[link]["url"]
+        if link.startswith(("http://", "https://", "//", "data:")):
+            return link
+        __source = os.path.join(self.media_directory, link.lstrip("/"))
+        if not os.path.isfile(__source):
+            return link
+        __digest = self.digests.sha256(__source)
+        __stem, __extension = os.path.splitext(os.path.basename(__source))
+        __name = f"{__stem}.{__digest[:12]}{__extension}"
+        __path = os.path.join(self.assets_path, __name)
+        # Content-addressed: an existing file with this name is already right.
+        if not os.path.exists(__path):
+            self.__copy(__source, __path)
+            self.written += 1
+        entry = {
+            "url": f"{self.base_url}assets/{__name}",
+            "path": os.path.relpath(__path, self.target),
+            "etag": etag(__digest),
+            "size": os.path.getsize(__path)
+        }
+        if __extension.lower() in COMPRESSIBLE:
+            with open(__path, "rb") as file:
+                entry.update(self.__compressed(__path, file.read()))
+        self.assets[link] = entry
+        return entry["url"]
+
+    def document(self, name: str, data: dict) -> dict:
+        __content = minify(data)
+        __digest = hashlib.sha256(__content).hexdigest()
+        __path = os.path.join(self.target, f"{name}.{__digest[:12]}.json")
+        if not os.path.exists(__path):
+            write_bytes(__path, __content)
+            self.written += 1
+        entry = {
+            "url": f"{self.base_url}{os.path.basename(__path)}",
+            "path": os.path.relpath(__path, self.target),
+            "etag": etag(__digest),
+            "size": len(__content)
+        }
+        entry.update(self.__compressed(__path, __content))
+        self.files[f"{name}.json"] = entry
+        return entry
+
+    def items(self, items: dict) -> dict:
+        __items = copy.deepcopy(items)
+        for entries in __items.values():
+            for item in entries:
+                item["link"] = self.asset(item["link"])
+        return self.document("items", __items)
+
+    def media(self, media: dict) -> dict:
+        __media = copy.deepcopy(media)
+        for entry in __media.get("media", []):
+            entry["link"] = self.asset(entry["link"])
+            if "thumbnail" in entry:
+                entry["thumbnail"] = self.asset(entry["thumbnail"])
+            for variant in entry.get("thumbnails", []):
+                variant["link"] = self.asset(variant["link"])
+        return self.document("media", __media)
+
+    def __paths(self, manifest: dict) -> set:
+        paths = set()
+        for entry in list(manifest.get("files", {}).values()) + list(manifest.get("assets", {}).values()):
+            paths.add(entry["path"])
+            paths.update(entry[key]["path"] for key in ["gzip", "br"] if key in entry)
+        return paths
+
+    def save(self) -> dict:
+        __previous = read_json(self.manifest_path) if os.path.exists(self.manifest_path) else {}
+        __current = self.__paths({"files": self.files, "assets": self.assets})
+        __kept = self.__paths(__previous)
+        manifest = {
+            "version": hashlib.sha256("".join(entry["etag"] for entry in self.files.values()).encode("utf-8")).hexdigest()[:12],
+            "generated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "files": self.files,
+            "assets": self.assets,
+            # Files of the previous version stay for kiosks still running it
+            # and are removed by the next publish.
+            "previous": sorted(__kept - __current)
+        }
+        # The manifest is the only file browsers revalidate; it is replaced
+        # atomically once everything it points at is in place.
+        write_text(self.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+        self.digests.prune([os.path.join(self.media_directory, link.lstrip("/")) for link in self.assets])
+        self.digests.save()
+        # Only files an earlier publish wrote are ever removed, so anything
+        # else in the directory is left alone.
+        removed = 0
+        for path in sorted(set(__previous.get("previous", [])) - __current - __kept):
+            __path = os.path.join(self.target, path)
+            if os.path.isfile(__path):
+                os.remove(__path)
+                removed += 1
+        manifest["removed"] = removed
+        return manifest
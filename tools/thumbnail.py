@@ -1,22 +1,149 @@
 import os
 import cv2
+import numpy as np
 
 from rich.console import Console
 
+from . import pool
+from .manifest import Manifest
+
 console = Console()
 
+# Frames darker than this (0-255) with almost no contrast are treated as black.
+BLACK_LEVEL = 16
+
+def score(frame) -> float:
+    # Every 8th pixel is plenty to tell a black or washed-out frame from a
+    # useful one, and keeps the score cheap next to the decode.
+    sample = frame[::8, ::8].astype(np.float32)
+    brightness = sample.mean()
+    contrast = sample.std()
+    if brightness < BLACK_LEVEL or brightness > 255 - BLACK_LEVEL:
+        return contrast * 0.1
+    return contrast
+
+def seek(cap, seconds: float, mode: str):
+    if mode == "fast":
+        # Seeking by timestamp lets the demuxer jump to the nearest keyframe.
+        cap.set(cv2.CAP_PROP_POS_MSEC, seconds * 1000)
+        ret, frame = cap.read()
+        if ret:
+            return frame
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if 0 < fps < 1000:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(fps * seconds))
+        ret, frame = cap.read()
+        return frame if ret else None
+    # The container reports no usable FPS: walk forward by timestamp instead.
+    if cap.get(cv2.CAP_PROP_POS_MSEC) > seconds * 1000:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    while cap.get(cv2.CAP_PROP_POS_MSEC) < seconds * 1000:
+        if not cap.grab():
+            return None
+    ret, frame = cap.retrieve()
+    return frame if ret else None
+
+def duration(cap) -> float:
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    if 0 < fps < 1000 and frames > 0:
+        return frames / fps
+    return None
+
+def best_frame(cap, timestamp_seconds: float, mode: str, candidates: int):
+    __duration = duration(cap)
+    __timestamps = [timestamp_seconds * (index + 1) for index in range(max(1, candidates))]
+    if __duration is not None:
+        __timestamps = [timestamp for timestamp in __timestamps if timestamp < __duration] or [min(timestamp_seconds, __duration / 2)]
+    best = None
+    best_score = -1
+    for timestamp in __timestamps:
+        frame = seek(cap, timestamp, mode)
+        if frame is None:
+            continue
+        __score = score(frame)
+        if __score > best_score:
+            best = frame
+            best_score = __score
+    if mode == "fast" and (best is None or best_score < 1):
+        # Nothing usable near the keyframes; pay for an accurate seek.
+        return best_frame(cap, timestamp_seconds, "accurate", candidates)
+    return best
+
+def resize(frame, width: int):
+    height, current = frame.shape[:2]
+    if width is None or current <= width:
+        return frame
+    return cv2.resize(frame, (width, max(1, round(height * width / current))), interpolation=cv2.INTER_AREA)
+
+def write(frame, target: str, quality: int) -> bool:
+    if target.endswith(".webp"):
+        return cv2.imwrite(target, frame, [cv2.IMWRITE_WEBP_QUALITY, quality])
+    return cv2.imwrite(target, frame, [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+
+def variants(frame, target: str, settings: dict) -> list:
+    __stem = os.path.splitext(target)[0]
+    __sizes = sorted(settings["sizes"], reverse=True)
+    # The plain .jpg stays the thumbnail existing kiosks load; it is capped at
+    # the largest variant so 4K sources do not produce multi-megabyte files.
+    frame = resize(frame, __sizes[0] if len(__sizes) > 0 else None)
+    if not write(frame, target, settings["quality"]):
+        raise OSError(f"could not write {target}")
+    targets = [target]
+    # Each size is scaled down from the previous one, the cheapest source.
+    for width in __sizes:
+        frame = resize(frame, width)
+        __target = f"{__stem}-{width}.{settings['format']}"
+        if not write(frame, __target, settings["quality"]):
+            raise OSError(f"could not write {__target}")
+        targets.append(__target)
+    return targets
+
+def extract(video: dict, media_path: str, settings: dict) -> dict:
+    __target = f"{media_path}/{video['name'].replace('.mp4', '.jpg')}"
+    result = {
+        "name": video["name"],
+        "path": video["path"],
+        "target": __target,
+        "targets": [],
+        "error": None
+    }
+    cap = cv2.VideoCapture(video["path"])
+    try:
+        if not cap.isOpened():
+            result["error"] = "could not open video"
+            return result
+        frame = best_frame(cap, settings["timestamp_seconds"], settings["mode"], settings["candidates"])
+        if frame is None:
+            result["error"] = "could not read frame"
+            return result
+        result["targets"] = variants(frame, __target, settings)
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        cap.release()
+    return result
+
 class Thumbnail:
-    def __init__(self, video_path: str, media_path: str, timestamp_seconds: int = 1) -> None:
+    def __init__(self, video_path: str, media_path: str, timestamp_seconds: int = 1, hash: bool = False, mode: str = "fast", candidates: int = 3, sizes: list = None, quality: int = 85, format: str = "jpg") -> None:
         self.video_path = video_path
         self.media_path = media_path
         self.timestamp_seconds = timestamp_seconds
+        self.mode = mode
+        self.candidates = candidates
+        self.sizes = sizes or []
+        self.quality = quality
+        self.format = format
         self.videos = self.list()
+        self.skipped = 0
+        self.removed = 0
         self.__check()
+        self.manifest = Manifest(os.path.join(self.media_path, ".manifest.json"), hash)
 
     def __check(self) -> None:
         if not os.path.exists(self.media_path):
             os.makedirs(self.media_path)
-        
+
     def list(self) -> list:
         if not os.path.exists(self.video_path):
             return []
@@ -29,24 +156,72 @@ class Thumbnail:
             }
             list_files_full.append(item)
         return list_files_full
-    
-    def generate(self) -> list:
-        for v in self.videos:
-            try:
-                console.print(f"🛠️ Generating thumbnail for {v['name']} in {self.media_path}...")
-                cap = cv2.VideoCapture(v["path"])
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                frame_number = int(fps * self.timestamp_seconds)
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-                ret, frame = cap.read()
-                __target = f"{self.media_path}/{v['name'].replace('.mp4', '.jpg')}"
-                if ret:
-                    cv2.imwrite(__target, frame)
-                else:
-                    print(f"Could not generate thumbnail for {v}")
-
-                cap.release()
-                console.print(f"✅ Thumbnail generated for {v['name']} as {__target}.", style="bold")
-                print()
-            except Exception as e:
-                print(f"Could not generate thumbnail for {v}: {e}")
+
+    def __report(self, result: dict, done: int, total: int) -> None:
+        if result["error"] is None:
+            console.print(f"✅ [{done}/{total}] Thumbnail generated for {result['name']} as {result['target']}.", style="bold")
+        else:
+            console.print(f"❌ [{done}/{total}] Could not generate thumbnail for {result['name']}: {result['error']}", style="red")
+
+    def settings(self) -> dict:
+        return {
+            "timestamp_seconds": self.timestamp_seconds,
+            "mode": self.mode,
+            "candidates": self.candidates,
+            "sizes": self.sizes,
+            "quality": self.quality,
+            "format": self.format
+        }
+
+    def __remove_targets(self, entry: dict) -> None:
+        for target in entry.get("targets", []):
+            if os.path.exists(target):
+                os.remove(target)
+                console.print(f"🗑  Removed orphaned thumbnail {target}.")
+                self.removed += 1
+
+    def __prune(self) -> None:
+        if len(self.videos) == 0:
+            # A missing or mistyped --source lists nothing; that is no reason
+            # to touch the thumbnails of the videos that are still there.
+            return
+        for entry in self.manifest.missing():
+            self.__remove_targets(entry)
+
+    def record(self, result: dict) -> None:
+        # Sizes or a format dropped from the settings leave files behind that
+        # the new run did not write; they go, so nothing links to them again.
+        __previous = self.manifest.remove(result["path"]) or {}
+        __targets = set(os.path.abspath(target) for target in result["targets"])
+        for target in __previous.get("targets", []):
+            if os.path.abspath(target) not in __targets and os.path.exists(target):
+                os.remove(target)
+                self.removed += 1
+        self.manifest.update(result["path"], result["targets"], self.settings())
+
+    def forget(self, path: str) -> None:
+        entry = self.manifest.remove(path)
+        if entry is not None:
+            self.__remove_targets(entry)
+            self.manifest.save()
+
+    def generate(self, workers: int = 1, force: bool = False, timeout: float = None) -> list:
+        self.__prune()
+        __settings = self.settings()
+        __videos = [v for v in self.videos if force or self.manifest.changed(v["path"], __settings)]
+        self.skipped = len(self.videos) - len(__videos)
+        if self.skipped > 0:
+            console.print(f"⏭️ {self.skipped} unchanged videos skipped.")
+        __results = self.__run(__videos, workers, __settings, timeout)
+        for result in __results:
+            if result["error"] is None:
+                self.record(result)
+        self.manifest.save()
+        return __results
+
+    def __run(self, videos: list, workers: int, settings: dict, timeout: float = None) -> list:
+        if workers > 1 and len(videos) > 1:
+            console.print(f"🛠️ Generating {len(videos)} thumbnails in {self.media_path} with {workers} workers...")
+        elif len(videos) > 0:
+            console.print(f"🛠️ Generating {len(videos)} thumbnails in {self.media_path}...")
+        return pool.run(extract, videos, (self.media_path, settings), workers, self.__report, timeout)
@@ -0,0 +1,189 @@
+import os
+import shutil
+import subprocess
+import cv2
+
+from rich.console import Console
+
+from . import mp4, pool
+from .manifest import Manifest
+
+console = Console()
+
+def probe(path: str) -> dict:
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        __fps = cap.get(cv2.CAP_PROP_FPS)
+        __frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        info = {
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": __fps if 0 < __fps < 1000 else None
+        }
+    finally:
+        cap.release()
+    __duration = __frames / __fps if info["fps"] and __frames > 0 else None
+    # Container and audio overhead included; close enough to spot masters.
+    info["bitrate"] = int(os.path.getsize(path) * 8 / __duration / 1000) if __duration else None
+    return info
+
+def scale(width: int, height: int, settings: dict) -> tuple:
+    __factor = min(1.0, settings["max_width"] / width, settings["max_height"] / height)
+    # Encoders want even dimensions.
+    return max(2, int(width * __factor) // 2 * 2), max(2, int(height * __factor) // 2 * 2)
+
+def conformant(path: str, info: dict, settings: dict) -> bool:
+    if info["width"] > settings["max_width"] or info["height"] > settings["max_height"]:
+        return False
+    if info["fps"] is not None and info["fps"] > settings["max_fps"] + 0.5:
+        return False
+    if info["bitrate"] is not None and info["bitrate"] > settings["bitrate"] * 1.1:
+        return False
+    return mp4.faststart(path)
+
+def pick_encoder(name: str) -> str:
+    if name == "auto":
+        return "ffmpeg" if shutil.which("ffmpeg") is not None else "opencv"
+    return name
+
+def ffmpeg(source: str, target: str, info: dict, settings: dict) -> None:
+    __width, __height = scale(info["width"], info["height"], settings)
+    __command = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y", "-i", source,
+        "-vf", f"scale={__width}:{__height}",
+        "-c:v", "libx264", "-preset", "medium", "-profile:v", "high", "-pix_fmt", "yuv420p",
+        "-b:v", f"{settings['bitrate']}k", "-maxrate", f"{settings['bitrate']}k", "-bufsize", f"{settings['bitrate'] * 2}k",
+        "-c:a", "aac", "-b:a", "128k",
+        "-movflags", "+faststart",
+        "-threads", str(settings["threads"])
+    ]
+    if info["fps"] is not None and info["fps"] > settings["max_fps"] + 0.5:
+        __command.extend(["-r", str(settings["max_fps"])])
+    __process = subprocess.run(__command + [target], capture_output=True, text=True)
+    if __process.returncode != 0:
+        raise RuntimeError(__process.stderr.strip().splitlines()[-1] if __process.stderr.strip() else f"ffmpeg exited with {__process.returncode}")
+
+def opencv(source: str, target: str, info: dict, settings: dict) -> None:
+    # VideoWriter has no bitrate control and drops audio; the size and frame
+    # rate limits still apply and the result is made faststart afterwards.
+    __width, __height = scale(info["width"], info["height"], settings)
+    __fps = min(info["fps"] or settings["max_fps"], settings["max_fps"])
+    __step = (info["fps"] or __fps) / __fps
+    __temp = f"{os.path.splitext(target)[0]}.moov.mp4"
+    cap = cv2.VideoCapture(source)
+    writer = cv2.VideoWriter(__temp, cv2.VideoWriter_fourcc(*"mp4v"), __fps, (__width, __height))
+    try:
+        if not writer.isOpened():
+            raise OSError(f"could not write {target}")
+        index = 0
+        __next = 0.0
+        while cap.grab():
+            if index >= __next:
+                ret, frame = cap.retrieve()
+                if ret:
+                    if frame.shape[1] != __width or frame.shape[0] != __height:
+                        frame = cv2.resize(frame, (__width, __height), interpolation=cv2.INTER_AREA)
+                    writer.write(frame)
+                __next += __step
+            index += 1
+    finally:
+        writer.release()
+        cap.release()
+    try:
+        if not mp4.relocate(__temp, target):
+            os.replace(__temp, target)
+    finally:
+        if os.path.exists(__temp):
+            os.remove(__temp)
+
+def transcode(video: dict, originals: str, settings: dict) -> dict:
+    result = dict(video, skipped=False, error=None)
+    info = probe(video["path"])
+    if info is None:
+        result["error"] = "could not open video"
+        return result
+    __directory, __name = os.path.split(video["path"])
+    __original = os.path.join(originals, __name) if originals is not None else None
+    if __original is not None and not video.get("output", False) and os.path.exists(__original):
+        # Not the file the last run wrote but a new upload, which is the
+        # master now; encoding the old original would bring back old footage.
+        os.remove(__original)
+    if conformant(video["path"], info, settings):
+        result["skipped"] = True
+        return result
+    # Re-encodes with new settings start from the kept master, not from an
+    # earlier transcode.
+    __source = __original if __original is not None and os.path.exists(__original) else video["path"]
+    if __source != video["path"]:
+        info = probe(__source) or info
+    # Hidden, so the library and watch mode never pick up a half-written file.
+    __temp = os.path.join(__directory, f".{__name}.transcode.mp4")
+    try:
+        if settings["encoder"] == "ffmpeg":
+            ffmpeg(__source, __temp, info, settings)
+        else:
+            opencv(__source, __temp, info, settings)
+        if __original is not None and not os.path.exists(__original):
+            os.makedirs(originals, exist_ok=True)
+            try:
+                os.link(video["path"], __original)
+            except OSError:
+                shutil.copy2(video["path"], __original)
+        os.replace(__temp, video["path"])
+    finally:
+        if os.path.exists(__temp):
+            os.remove(__temp)
+    return result
+
+class Transcode:
+    def __init__(self, video_path: str, originals: str = None, max_width: int = 1920, max_height: int = 1080, bitrate: int = 6000, max_fps: int = 30, encoder: str = "auto") -> None:
+        self.video_path = video_path
+        self.originals = originals
+        self.settings = {
+            "max_width": max_width,
+            "max_height": max_height,
+            "bitrate": bitrate,
+            "max_fps": max_fps,
+            "encoder": pick_encoder(encoder),
+            "threads": 0
+        }
+        self.videos = [{"path": f"{self.video_path}/{name}", "name": name} for name in sorted(os.listdir(self.video_path)) if name.endswith(".mp4") and not name.startswith(".")] if os.path.exists(self.video_path) else []
+        self.manifest = Manifest(os.path.join(self.video_path, ".transcode-manifest.json"))
+        self.skipped = 0
+
+    def __key(self) -> dict:
+        # Thread counts do not change the output, so they stay out of the
+        # manifest settings.
+        return {key: value for key, value in self.settings.items() if key != "threads"}
+
+    def __report(self, result: dict, done: int, total: int) -> None:
+        if result["error"] is not None:
+            console.print(f"❌ [{done}/{total}] Could not transcode {result['name']}: {result['error']}", style="red")
+            return
+        # Saved after every video, so an interrupted run resumes where it
+        # stopped instead of starting over.
+        self.manifest.update(result["path"], [], self.__key())
+        self.manifest.save()
+        if result["skipped"]:
+            console.print(f"⏭️ [{done}/{total}] {result['name']} already fits the kiosk profile.")
+        else:
+            console.print(f"✅ [{done}/{total}] {result['name']} transcoded.", style="bold")
+
+    def pending(self, force: bool = False) -> list:
+        return [dict(v, output=self.manifest.recorded(v["path"])) for v in self.videos if force or self.manifest.changed(v["path"], self.__key())]
+
+    def generate(self, workers: int = 1, force: bool = False) -> list:
+        self.manifest.prune([v["path"] for v in self.videos])
+        __videos = self.pending(force)
+        self.skipped = len(self.videos) - len(__videos)
+        if self.skipped > 0:
+            console.print(f"⏭️ {self.skipped} videos transcoded before skipped.")
+        if self.settings["encoder"] == "opencv" and len(__videos) > 0:
+            console.print("⚠️ ffmpeg was not found; using OpenCV, which cannot limit the bitrate and drops audio.", style="yellow")
+        # ffmpeg is multithreaded itself; split the cores between the jobs.
+        self.settings["threads"] = max(1, (os.cpu_count() or 1) // max(1, min(workers, len(__videos))))
+        __results = pool.run(transcode, __videos, (self.originals, self.settings), workers, self.__report)
+        self.manifest.save()
+        return __results
@@ -0,0 +1,278 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+from rich.console import Console
+
+from . import pool
+from .library import FOLDERS, IMAGE_EXTENSIONS, VIDEO_EXTENSIONS
+from .thumbnail import extract
+
+console = Console()
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT = struct.Struct("iIII")
+
+# Events are (path, kind) with kind "changed", "removed" or "directory";
+# a None path means events were lost and everything must be looked at again.
+
+class Inotify:
+    def __init__(self) -> None:
+        __name = ctypes.util.find_library("c")
+        if __name is None:
+            raise OSError(errno.ENOSYS, "libc not found")
+        self.__libc = ctypes.CDLL(__name, use_errno=True)
+        if not hasattr(self.__libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self.__libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.__watches = {}
+
+    def add(self, directory: str) -> list:
+        __wd = self.__libc.inotify_add_watch(self.fd, os.fsencode(directory), MASK)
+        if __wd < 0:
+            raise OSError(ctypes.get_errno(), f"{os.strerror(ctypes.get_errno())}: {directory}")
+        self.__watches[__wd] = directory
+        return []
+
+    def read(self, timeout: float) -> list:
+        __ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not __ready:
+            return []
+        try:
+            __data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        __offset = 0
+        while __offset < len(__data):
+            __wd, __mask, _, __length = EVENT.unpack_from(__data, __offset)
+            __name = __data[__offset + EVENT.size:__offset + EVENT.size + __length].rstrip(b"\0").decode(errors="surrogateescape")
+            __offset += EVENT.size + __length
+            if __mask & IN_Q_OVERFLOW:
+                events.append((None, "changed"))
+                continue
+            if __mask & IN_IGNORED:
+                self.__watches.pop(__wd, None)
+                continue
+            __directory = self.__watches.get(__wd)
+            if __directory is None or __name == "":
+                continue
+            __path = os.path.join(__directory, __name)
+            if __mask & IN_ISDIR:
+                if __mask & (IN_CREATE | IN_MOVED_TO):
+                    events.append((__path, "directory"))
+                continue
+            events.append((__path, "removed" if __mask & (IN_DELETE | IN_MOVED_FROM) else "changed"))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+class Poller:
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self.__roots = []
+        self.__files = {}
+        self.__scanned = time.monotonic()
+
+    def __scan(self, directory: str, files: dict) -> None:
+        try:
+            with os.scandir(directory) as iterator:
+                for item in iterator:
+                    if item.is_dir(follow_symlinks=False):
+                        self.__scan(item.path, files)
+                    elif item.is_file():
+                        __stat = item.stat()
+                        files[item.path] = (__stat.st_size, __stat.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+
+    def add(self, directory: str) -> list:
+        if any(directory == root or directory.startswith(root + os.sep) for root in self.__roots):
+            return []
+        self.__roots.append(directory)
+        self.__scan(directory, self.__files)
+        return []
+
+    def read(self, timeout: float) -> list:
+        __wait = max(0.0, self.__scanned + self.interval - time.monotonic())
+        if timeout < __wait:
+            time.sleep(timeout)
+            return []
+        time.sleep(__wait)
+        self.__scanned = time.monotonic()
+        __files = {}
+        for root in self.__roots:
+            self.__scan(root, __files)
+        events = [(path, "changed") for path, stat in __files.items() if self.__files.get(path) != stat]
+        events.extend((path, "removed") for path in self.__files if path not in __files)
+        self.__files = __files
+        return events
+
+    def close(self) -> None:
+        pass
+
+class Watcher:
+    def __init__(self, media_directory: str, thumbnail, catalog, workers: int = 1, settle: float = 2.0, interval: float = 1.0, polling: bool = False, timeout: float = None) -> None:
+        self.media_directory = media_directory
+        self.thumbnail = thumbnail
+        self.catalog = catalog
+        self.workers = max(1, workers)
+        self.settle = settle
+        self.timeout = timeout
+        self.backend = None
+        if not polling:
+            try:
+                self.backend = Inotify()
+            except (OSError, AttributeError) as e:
+                console.print(f"⚠️ inotify is not available ({e}); polling every {interval}s instead.", style="yellow")
+        if self.backend is None:
+            self.backend = Poller(interval)
+        # path -> (size, mtime) last seen and the time it must stay unchanged until
+        self.pending = {}
+        self.queue = []
+        # path -> (size, mtime) of videos that failed; decoders open files and
+        # fire events of their own, so a broken video is only tried again
+        # once it actually changed.
+        self.failed = {}
+        self.stale = False
+
+    def __watch(self, directory: str, new: bool = False) -> None:
+        self.backend.add(directory)
+        if isinstance(self.backend, Inotify):
+            for root, directories, files in os.walk(directory):
+                for name in directories:
+                    self.backend.add(os.path.join(root, name))
+                if new:
+                    # Files moved in with a new directory arrived before its watch.
+                    for name in files:
+                        self.__touch(os.path.join(root, name))
+
+    def __stat(self, path: str):
+        try:
+            __stat = os.stat(path)
+            return (__stat.st_size, __stat.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def __touch(self, path: str) -> None:
+        self.pending[path] = (self.__stat(path), time.monotonic() + self.settle)
+
+    def __folder(self, path: str) -> str:
+        return os.path.relpath(path, self.media_directory).split(os.sep, 1)[0]
+
+    def __wanted(self, path: str) -> bool:
+        if path in self.queue or not self.thumbnail.manifest.changed(path, self.thumbnail.settings()):
+            return False
+        return path not in self.failed or self.failed[path] != self.__stat(path)
+
+    def __rescan(self) -> None:
+        for video in self.thumbnail.list():
+            if self.__wanted(video["path"]):
+                self.queue.append(video["path"])
+        self.stale = True
+
+    def __handle(self, path: str, kind: str) -> None:
+        if path is None:
+            self.__rescan()
+            return
+        if os.path.basename(path).startswith("."):
+            return
+        if kind == "directory":
+            self.__watch(path, True)
+            return
+        if kind == "removed":
+            self.pending.pop(path, None)
+            self.failed.pop(path, None)
+            if self.__folder(path) == "videos":
+                self.thumbnail.forget(path)
+            self.stale = True
+            return
+        self.__touch(path)
+
+    def __settled(self) -> None:
+        __now = time.monotonic()
+        for path, (stat, deadline) in list(self.pending.items()):
+            if deadline > __now:
+                continue
+            __stat = self.__stat(path)
+            if __stat is None:
+                del self.pending[path]
+                continue
+            if __stat != stat:
+                # Still being copied: wait for another quiet period.
+                self.pending[path] = (__stat, __now + self.settle)
+                continue
+            del self.pending[path]
+            __folder = self.__folder(path)
+            __extension = os.path.splitext(path)[1].lower()
+            if __folder == "videos" and __extension in VIDEO_EXTENSIONS:
+                if self.__wanted(path):
+                    self.queue.append(path)
+                self.stale = True
+            elif (__folder == "images" and __extension in IMAGE_EXTENSIONS) or __folder == "thumbnails":
+                self.stale = True
+
+    def __report(self, result: dict, done: int, total: int) -> None:
+        if result["error"] is None:
+            self.failed.pop(result["path"], None)
+            self.thumbnail.record(result)
+            self.thumbnail.manifest.save()
+            console.print(f"✅ Thumbnail generated for {result['name']}.", style="bold")
+            self.stale = True
+        else:
+            self.failed[result["path"]] = self.__stat(result["path"])
+            console.print(f"❌ Could not generate thumbnail for {result['name']}: {result['error']}", style="red")
+
+    def __generate(self) -> None:
+        __videos = [{"path": path, "name": os.path.basename(path)} for path in self.queue]
+        self.queue = []
+        for video in __videos:
+            console.print(f"🛠️ Generating thumbnail for {video['name']}...")
+        # The pool isolates crashing videos and gives up on hung ones; events
+        # that arrive meanwhile wait in the backend until the batch is done.
+        pool.run(extract, __videos, (self.thumbnail.media_path, self.thumbnail.settings()), self.workers, self.__report, self.timeout)
+
+    def __timeout(self) -> float:
+        if len(self.pending) == 0:
+            return 1.0
+        return max(0.0, min(deadline for _, deadline in self.pending.values()) - time.monotonic())
+
+    def run(self) -> None:
+        for folder in FOLDERS:
+            self.__watch(os.path.join(self.media_directory, folder))
+        # Catch up on whatever changed while nothing was watching.
+        self.__rescan()
+        try:
+            while True:
+                for path, kind in self.backend.read(self.__timeout()):
+                    self.__handle(path, kind)
+                self.__settled()
+                if len(self.queue) > 0:
+                    self.__generate()
+                # The catalog is updated once the burst of changes is over.
+                if self.stale and len(self.pending) == 0 and len(self.queue) == 0:
+                    self.stale = False
+                    self.catalog()
+        finally:
+            self.backend.close()